@@ -2,31 +2,27 @@ import os
 import logging
 import re
 import asyncio
+import threading
 from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from ats_utils import extract_keywords, evaluate_ats_score
+from ats_utils import extract_keywords, aevaluate_ats_score, ascore_batch
+from llm_cache import cache_key, create_response_cache
+from llm_scheduler import scheduler
+from resume_parser import parse_resume
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-section_llm = ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0.2)
-feedback_llm = ChatGroq(model_name="llama-3.1-8b-instant", temperature=0.25)
+SECTION_MODEL = "llama-3.3-70b-versatile"
+SECTION_TEMPERATURE = 0.2
+FEEDBACK_MODEL = "llama-3.1-8b-instant"
+FEEDBACK_TEMPERATURE = 0.25
 
-EDUCATION_ALIASES = {
-    "education", "academic background", "academic qualifications",
-    "academic history", "educational qualifications", "qualifications",
-    "academics", "educational background"
-}
-PERSONAL_ALIASES = {
-    "personal information", "personal details", "contact information",
-    "contact details", "profile", "about me"
-}
-
-COLLEGE_PATTERN = re.compile(r"\b(college|institute|university|academy|school of)\b", re.IGNORECASE)
-EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
-PHONE_PATTERN = re.compile(r"\+?[0-9]{1,4}?[-.\s]?\(?\d{1,3}?\)?[-.\s]?\d{1,3}[-.\s]?\d{1,4}")
-SOCIAL_LINKS_PATTERN = re.compile(r"(linkedin|github)\.(com|in)\/([A-Za-z0-9-]+)", re.IGNORECASE)
+# The feedback pass is skipped when the section-level resume already scores
+# this high, and otherwise only runs on sections below the similarity floor.
+FEEDBACK_SCORE_THRESHOLD = float(os.getenv("FEEDBACK_SCORE_THRESHOLD", 75))
+FEEDBACK_SECTION_SIMILARITY = float(os.getenv("FEEDBACK_SECTION_SIMILARITY", 45))
 
 section_prompt = ChatPromptTemplate.from_template("""
 You are an expert Resume Optimization Assistant specializing in ATS alignment and professional resume writing.
@@ -64,156 +60,269 @@ Job Description Context:
 
 Return ONLY the optimized section content (no headings or extra text).
 """)
-section_chain = section_prompt | section_llm | StrOutputParser()
 
 feedback_prompt = ChatPromptTemplate.from_template("""
-You are a Senior Resume Refinement Specialist conducting final quality assurance.
+You are a Senior Resume Refinement Specialist conducting final quality assurance on the resume sections below.
+Each section is scored on its own against the job description.
 
-ANALYSIS:
-- Original ATS Score: {ats_score}%
-  - Keyword Match: {keyword_score}%
-  - Semantic Similarity: {similarity_score}%
-- Job Description Keywords: {keywords}
+Job Description Keywords: {keywords}
 
 TASK:
-Perform FINAL optimization pass to:
-1. Maximize keyword density without sacrificing readability
-2. Improve semantic alignment where similarity score was low
-3. Ensure all sections maintain consistent:
+Refine every section below to:
+1. Improve semantic alignment with the keywords, since each scored low on similarity
+2. Keep each section's existing structure:
    - Verb tense (past/present)
    - Bullet formatting
    - Measurement units (%, $, numbers)
-4. Resolve any remaining issues:
+3. Resolve any remaining issues:
    - Overly long bullet points
    - Passive voice
    - Vague content without metrics
 
 RULES:
-- Only refine based on original resume content
+- Work on each section separately; never move content between sections
+- NEVER add headings, other sections, or content not in the original section
 - Preserve all factual data
 - Prioritize clarity over keyword stuffing
 
-Input Resume:
-{resume}
+Input Sections:
+{sections}
 
-Return ONLY the improved resume with NO additional commentary.
+Return every section in the same order, each starting with its marker line copied exactly
+(for example "=== SECTION: Experience ==="), followed only by the improved section content.
 """)
-feedback_chain = feedback_prompt | feedback_llm | StrOutputParser()
-
-async def rewrite_section(section_type, section_text, jd_keywords, job_description):
-    try:
-        logging.info(f"Rewriting section: {section_type}")
-        if len(section_text.split('\n')) < 2 and len(section_text) < 100:
-            return section_type, section_text.strip()
-
-        result = await section_chain.ainvoke({
-            "section_type": section_type,
-            "section_text": section_text.strip(),
-            "job_description": job_description,
-            "keywords": ", ".join(jd_keywords)
-        })
+_chains = {}
+_chains_lock = threading.Lock()
+
+def _get_chain(name):
+    # ChatGroq clients are built on first use so importing this module stays cheap.
+    chain = _chains.get(name)
+    if chain is None:
+        with _chains_lock:
+            if not _chains:
+                section_llm = ChatGroq(model_name=SECTION_MODEL, temperature=SECTION_TEMPERATURE)
+                feedback_llm = ChatGroq(model_name=FEEDBACK_MODEL, temperature=FEEDBACK_TEMPERATURE)
+                _chains["section"] = section_prompt | section_llm | StrOutputParser()
+                _chains["feedback"] = feedback_prompt | feedback_llm | StrOutputParser()
+            chain = _chains[name]
+    return chain
+
+def get_section_chain():
+    return _get_chain("section")
+
+def get_feedback_chain():
+    return _get_chain("feedback")
+
+response_cache = create_response_cache()
+
+def is_ready():
+    return bool(_chains)
+
+def warm_up():
+    get_section_chain()
+
+async def rewrite_section(section_type, section_text, jd_keywords, job_description, use_cache=True):
+    logging.info(f"Rewriting section: {section_type}")
+    if len(section_text.split('\n')) < 2 and len(section_text) < 100:
+        return section_type, section_text.strip()
 
-        return section_type, re.sub(r'\n{3,}', '\n\n', result.strip())
+    inputs = {
+        "section_type": section_type,
+        "section_text": section_text.strip(),
+        "job_description": job_description,
+        "keywords": ", ".join(jd_keywords)
+    }
+    key = cache_key(**inputs, model=SECTION_MODEL, temperature=SECTION_TEMPERATURE)
+    if use_cache:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            logging.info(f"Cache hit for section: {section_type}")
+            return section_type, cached
+
+    # Failures surface as LLMUnavailableError once the scheduler's retries
+    # are exhausted rather than silently returning the original text.
+    result = await scheduler.invoke(get_section_chain(), inputs, SECTION_MODEL)
+    result = re.sub(r'\n{3,}', '\n\n', result.strip())
+    await response_cache.set(key, result)
+
+    return section_type, result
+
+def assemble_resume(parsed, contents):
+    """Join section bodies in ``parsed`` order; only titled sections get a header line."""
+    blocks = []
+    for section in parsed.sections:
+        if section.header in contents:
+            body = contents.pop(section.header)
+            blocks.append(f"{section.header}\n{body}" if section.titled else body)
+    return "\n\n".join(blocks)
+
+FEEDBACK_MARKER = "=== SECTION: {} ==="
+FEEDBACK_MARKER_PATTERN = re.compile(r"^\s*=== SECTION: (.+?) ===\s*$")
+
+def feedback_sections_input(headers, contents, scores):
+    """The ``sections`` input of the feedback prompt: each section under its marker with its scores."""
+    blocks = []
+    for header in headers:
+        final_score, keyword_score, similarity_score = scores[header]
+        blocks.append(
+            f"{FEEDBACK_MARKER.format(header)}\n"
+            f"(Section ATS Score: {final_score}%, Keyword Match: {keyword_score}%, "
+            f"Semantic Similarity: {similarity_score}%)\n{contents[header]}"
+        )
+    return "\n\n".join(blocks)
 
-    except Exception as e:
-        logging.error(f"Error rewriting {section_type}: {e}")
-        return section_type, section_text.strip()
+class FeedbackSplitter:
+    """Splits the combined feedback stream back into sections as chunks arrive.
 
-def normalize_header(header):
-    return header.lower().strip()
+    ``feed`` returns ``(header, text)`` pieces for complete lines; marker lines
+    switch the current section and are not emitted. Text before the first
+    marker, or under a header that was not asked for, is dropped.
+    """
 
-async def get_rewritten_resume(resume_text, job_description):
+    def __init__(self, headers):
+        self.headers = set(headers)
+        self.current = None
+        self.pending = ""
+        self.sections = {}
+
+    def _line(self, line):
+        match = FEEDBACK_MARKER_PATTERN.match(line)
+        if match:
+            self.current = match.group(1).strip() if match.group(1).strip() in self.headers else None
+            return []
+        if self.current is None:
+            return []
+        self.sections[self.current] = self.sections.get(self.current, "") + line
+        return [(self.current, line)]
+
+    def feed(self, chunk):
+        self.pending += chunk
+        pieces = []
+        while "\n" in self.pending:
+            line, self.pending = self.pending.split("\n", 1)
+            pieces += self._line(line + "\n")
+        return pieces
+
+    def close(self):
+        line, self.pending = self.pending, ""
+        pieces = self._line(line) if line else []
+        return pieces, {header: text.strip() for header, text in self.sections.items() if text.strip()}
+
+def section_fingerprint(header, content, jd_keywords):
+    return cache_key(header=header, content=content.strip(), keywords=sorted(jd_keywords))
+
+async def stream_rewritten_resume(resume_text, job_description, use_cache=True, state=None, parsed=None):
+    """Run the optimization pipeline, yielding progress events as they happen.
+
+    Events are dicts with an ``event`` key: ``keywords``, one ``section`` per
+    rewritten section in completion order, ``token`` lines (tagged with their
+    section) from the single combined feedback call, and a final ``resume``
+    event carrying the finished text.
+
+    ``state`` is the previous run's per-section outputs for the same document;
+    it is updated in place. Sections whose text and the JD keyword set are
+    unchanged are reused instead of being sent to the LLM again.
+
+    ``parsed`` may carry an already-parsed ``ParsedResume`` for ``resume_text``.
+    """
+    state = {} if state is None else state
+    previous_sections = state.get("sections", {}) if use_cache else {}
+    previous_feedback = state.get("feedback", {}) if use_cache else {}
     logging.info("Starting resume optimization...")
     jd_keywords = extract_keywords(job_description)
     logging.info(f"Extracted JD Keywords: {jd_keywords}")
+    yield {"event": "keywords", "keywords": jd_keywords}
 
-    lines = resume_text.splitlines()
-    sections, index = {}, 0
-    personal_lines = []
-
-    for i, line in enumerate(lines[:10]):
-        if any([  
-            re.search(EMAIL_PATTERN, line),
-            re.search(PHONE_PATTERN, line),
-            re.search(SOCIAL_LINKS_PATTERN, line)
-        ]) or re.match(r"^[A-Z][A-Za-z\s]+$", line.strip()):
-            personal_lines.append(line)
-        else:
-            break
-
-    if personal_lines:
-        sections["Personal Details"] = "\n".join(personal_lines)
-        index = len(personal_lines)
-
-    current_section = None
-    for line in lines[index:]:
-        clean = line.strip()
-        if not clean:
-            continue
-        norm = normalize_header(clean)
-        is_education = any(norm == alias or norm.startswith(alias) for alias in EDUCATION_ALIASES)
-        is_personal = any(norm == alias or norm.startswith(alias) for alias in PERSONAL_ALIASES)
-        is_header = (is_education or is_personal or 
-                    re.match(r"^[A-Z][A-Za-z\s]+$", clean))
-        
-        if is_header:
-            current_section = clean
-            sections[current_section] = ""
-        elif current_section:
-            sections[current_section] += line + "\n"
-
-    if not any(normalize_header(k) in EDUCATION_ALIASES for k in sections):
-        edu_lines = [line for line in lines if COLLEGE_PATTERN.search(line)]
-        if edu_lines:
-            sections["Education"] = "\n".join(edu_lines)
-
-    rewritable_sections, excluded_sections = {}, {}
-    for header, content in sections.items():
-        norm = normalize_header(header)
-        is_excluded = (
-            any(norm == alias or norm.startswith(alias) for alias in EDUCATION_ALIASES) or
-            any(norm == alias or norm.startswith(alias) for alias in PERSONAL_ALIASES)
-        )
-        
-        if is_excluded:
-            excluded_sections[header] = content.strip()
-        else:
-            rewritable_sections[header] = content.strip()
-
-    if "Education" in sections and sections["Education"].strip():
-        excluded_sections["Education"] = sections["Education"].strip()
-        del sections["Education"]  # Remove from rewritable sections
+    parsed = parsed or parse_resume(resume_text)
+    rewritable_sections, excluded_sections = parsed.rewritable(), parsed.excluded()
 
-    tasks = [
-        rewrite_section(header, content, jd_keywords, job_description)
+    fingerprints = {
+        header: section_fingerprint(header, content, jd_keywords)
         for header, content in rewritable_sections.items() if content.strip()
-    ]
-    rewritten = await asyncio.gather(*tasks)
-    rewritten_dict = dict(rewritten)
+    }
+    rewritten_dict = {}
+    tasks = []
+    for header, fingerprint in fingerprints.items():
+        if fingerprint in previous_sections:
+            rewritten_dict[header] = previous_sections[fingerprint]
+            yield {"event": "section", "section": header, "content": rewritten_dict[header], "reused": True}
+        else:
+            tasks.append(asyncio.ensure_future(
+                rewrite_section(header, rewritable_sections[header], jd_keywords, job_description, use_cache=use_cache)
+            ))
+    logging.info(f"Rewriting {len(tasks)} of {len(fingerprints)} sections")
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            header, content = await next_done
+            rewritten_dict[header] = content
+            yield {"event": "section", "section": header, "content": content, "reused": False}
+    finally:
+        for task in tasks:
+            task.cancel()
+    state["sections"] = {fingerprints[header]: content for header, content in rewritten_dict.items()}
 
     all_sections = {**rewritten_dict, **excluded_sections}
-    ordered_resume = "\n\n".join(
-        f"{header}\n{all_sections[header]}" 
-        for header in sections 
-        if header in all_sections
-    )
-
-    ats_score_1, keyword_score_1, similarity_score_1 = evaluate_ats_score(ordered_resume, jd_keywords)
-    
-
-    improved_resume = await feedback_chain.ainvoke({
-        "resume": ordered_resume,
-        "original_resume": resume_text,
-        "ats_score": ats_score_1,
-        "keyword_score": keyword_score_1,
-        "similarity_score": similarity_score_1,
-        "keywords": ", ".join(jd_keywords)
-    })
-
-    ats_score_2, _, similarity_score_2 = evaluate_ats_score(improved_resume, jd_keywords)
-    
-
-    return improved_resume.strip()
+    ordered_resume = assemble_resume(parsed, dict(all_sections))
+
+    ats_score_1, keyword_score_1, similarity_score_1 = await aevaluate_ats_score(ordered_resume, jd_keywords)
+    if ats_score_1 >= FEEDBACK_SCORE_THRESHOLD:
+        logging.info(f"ATS score {ats_score_1} clears {FEEDBACK_SCORE_THRESHOLD}; skipping feedback pass")
+        state["feedback"] = {}
+        yield {"event": "resume", "rewritten_resume": ordered_resume.strip()}
+        return
+
+    headers = list(rewritten_dict)
+    section_scores = dict(zip(headers, await ascore_batch([rewritten_dict[h] for h in headers], jd_keywords)))
+    low_sections = [h for h in headers if section_scores[h][2] < FEEDBACK_SECTION_SIMILARITY]
+    logging.info(f"Running feedback pass on {len(low_sections)} of {len(headers)} sections")
+
+    feedback_fingerprints = {
+        header: section_fingerprint(header, rewritten_dict[header], jd_keywords) for header in low_sections
+    }
+    feedback = {}
+    pending = []
+    for header in low_sections:
+        if feedback_fingerprints[header] in previous_feedback:
+            feedback[header] = previous_feedback[feedback_fingerprints[header]]
+        else:
+            pending.append(header)
+    if pending:
+        # One call for all low sections rather than one per section.
+        splitter = FeedbackSplitter(pending)
+        async for chunk in scheduler.stream(get_feedback_chain(), {
+            "sections": feedback_sections_input(pending, rewritten_dict, section_scores),
+            "keywords": ", ".join(jd_keywords)
+        }, FEEDBACK_MODEL):
+            for header, text in splitter.feed(chunk):
+                yield {"event": "token", "section": header, "text": text}
+        pieces, revised = splitter.close()
+        for header, text in pieces:
+            yield {"event": "token", "section": header, "text": text}
+        feedback.update(revised)
+
+    # Keep whichever version of each section scores higher.
+    candidates = [h for h in low_sections if feedback.get(h)]
+    revised_scores = await ascore_batch([feedback[h] for h in candidates], jd_keywords)
+    for header, revised_score in zip(candidates, revised_scores):
+        if revised_score[0] > section_scores[header][0]:
+            all_sections[header] = feedback[header]
+    state["feedback"] = {feedback_fingerprints[h]: feedback[h] for h in candidates}
+
+    improved_resume = assemble_resume(parsed, dict(all_sections))
+    ats_score_2, _, _ = await aevaluate_ats_score(improved_resume, jd_keywords)
+    if ats_score_2 < ats_score_1:
+        improved_resume = ordered_resume
+
+    yield {"event": "resume", "rewritten_resume": improved_resume.strip()}
+
+async def get_rewritten_resume(resume_text, job_description, use_cache=True, state=None, parsed=None):
+    improved_resume = None
+    async for event in stream_rewritten_resume(
+        resume_text, job_description, use_cache=use_cache, state=state, parsed=parsed
+    ):
+        if event["event"] == "resume":
+            improved_resume = event["rewritten_resume"]
+    return improved_resume
 
 if __name__ == "__main__":
     resume_text = """
@@ -1,24 +1,155 @@
-from sentence_transformers import SentenceTransformer, util
+import logging
+import threading
 
-similarity_model = SentenceTransformer("all-MiniLM-L6-v2")
+import numpy as np
+
+from embedding_cache import EmbeddingCache, text_hash
+from embedding_service import EmbeddingService
+import keyword_engine
+from similarity_backend import SIMILARITY_BACKEND, load_model
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+# Backends produce slightly different vectors, so they must not share cache entries.
+EMBEDDING_NAMESPACE = f"{MODEL_NAME}:{SIMILARITY_BACKEND}"
+
+_similarity_model = None
+_model_lock = threading.Lock()
+embedding_cache = EmbeddingCache()
+
+def get_similarity_model():
+    """Load the sentence-transformers model on first use.
+
+    torch / onnxruntime are only imported here, so processes that never score a resume
+    (auth-only workers) never pay for it.
+    """
+    global _similarity_model
+    if _similarity_model is None:
+        with _model_lock:
+            if _similarity_model is None:
+                logging.info(f"Loading similarity model {MODEL_NAME} ({SIMILARITY_BACKEND} backend)")
+                _similarity_model = load_model(MODEL_NAME)
+    return _similarity_model
+
+def is_model_loaded():
+    return _similarity_model is not None
+
+def warm_up():
+    get_similarity_model()
+    _encode_uncached(["warm up"])
 
 def extract_keywords(text, top_n=15):
-    words = text.lower().split()
-    keywords = [w.strip(".,:-()") for w in words if len(w) > 3]
-    freq = {}
-    for word in keywords:
-        freq[word] = freq.get(word, 0) + 1
-    sorted_keywords = sorted(freq.items(), key=lambda x: x[1], reverse=True)
-    return [kw for kw, _ in sorted_keywords[:top_n]]
+    return keyword_engine.extract_keywords(text, top_n=top_n)
 
-def evaluate_ats_score(resume, jd_keywords):
-    resume_text = resume.lower()
-    keyword_matches = sum(1 for word in jd_keywords if word in resume_text)
-    keyword_score = round((keyword_matches / len(jd_keywords)) * 100, 2)
+def _encode_uncached(texts):
+    return get_similarity_model().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+embedding_service = EmbeddingService(_encode_uncached)
+
+def _keys(texts):
+    return [text_hash(text, EMBEDDING_NAMESPACE) for text in texts]
+
+def _missing(keys, vectors):
+    missing = {}
+    for i, vector in enumerate(vectors):
+        if vector is None:
+            missing.setdefault(keys[i], []).append(i)
+    return missing
+
+def _fill(vectors, missing, encoded, put):
+    for (key, indexes), vector in zip(missing.items(), encoded):
+        put(key, vector)
+        for i in indexes:
+            vectors[i] = vector
+    return vectors
+
+def encode(texts):
+    """Return unit-normalised embeddings for ``texts``, encoding only cache misses."""
+    keys = _keys(texts)
+    vectors = [embedding_cache.get(key) for key in keys]
+    missing = _missing(keys, vectors)
+    if missing:
+        pending = [texts[indexes[0]] for indexes in missing.values()]
+        _fill(vectors, missing, _encode_uncached(pending), embedding_cache.put)
+    return vectors
+
+async def aencode(texts):
+    """Like ``encode`` but batches misses with other callers via ``embedding_service``
+    and keeps the cache's disk tier off the event loop."""
+    keys = _keys(texts)
+    vectors = await embedding_cache.aget_many(keys)
+    missing = _missing(keys, vectors)
+    if missing:
+        pending = [texts[indexes[0]] for indexes in missing.values()]
+        _fill(vectors, missing, await embedding_service.embed(pending), embedding_cache.put_behind)
+    return vectors
 
-    embedding1 = similarity_model.encode(resume, convert_to_tensor=True)
-    embedding2 = similarity_model.encode(" ".join(jd_keywords), convert_to_tensor=True)
-    similarity_score = round(util.pytorch_cos_sim(embedding1, embedding2).item() * 100, 2)
+def cosine_similarity(a, b):
+    return float(np.dot(a, b))
 
+def keyword_match_score(resume, jd_keywords):
+    if not jd_keywords:
+        return 0.0
+    matcher = keyword_engine.compile_keywords(tuple(jd_keywords))
+    return round(matcher.coverage(resume) * 100, 2)
+
+def _combine(keyword_score, embedding1, embedding2):
+    similarity_score = round(cosine_similarity(embedding1, embedding2) * 100, 2)
     final_score = round((keyword_score * 0.6 + similarity_score * 0.4), 2)
     return final_score, keyword_score, similarity_score
+
+def evaluate_ats_score(resume, jd_keywords):
+    keyword_score = keyword_match_score(resume, jd_keywords)
+    embedding1, embedding2 = encode([resume, " ".join(jd_keywords)])
+    return _combine(keyword_score, embedding1, embedding2)
+
+async def aevaluate_ats_score(resume, jd_keywords):
+    keyword_score = keyword_match_score(resume, jd_keywords)
+    embedding1, embedding2 = await aencode([resume, " ".join(jd_keywords)])
+    return _combine(keyword_score, embedding1, embedding2)
+
+async def ascore_matrix(resumes, keyword_sets):
+    """Score every resume against every JD keyword set in one pass.
+
+    Returns ``(final, keyword, similarity)`` arrays of shape
+    ``(len(resumes), len(keyword_sets))``. Keyword coverage is computed from a
+    resume-by-vocabulary match matrix and similarity as one matrix product.
+    """
+    if not resumes or not keyword_sets:
+        empty = np.zeros((len(resumes), len(keyword_sets)))
+        return empty, empty, empty
+
+    vocabulary = sorted({keyword for keywords in keyword_sets for keyword in keywords})
+    position = {keyword: i for i, keyword in enumerate(vocabulary)}
+    matcher = keyword_engine.compile_keywords(tuple(vocabulary))
+
+    resume_hits = np.zeros((len(resumes), len(vocabulary)), dtype=np.float64)
+    for row, resume in enumerate(resumes):
+        for keyword in matcher.match(resume):
+            resume_hits[row, position[keyword]] = 1.0
+    jd_terms = np.zeros((len(keyword_sets), len(vocabulary)), dtype=np.float64)
+    for row, keywords in enumerate(keyword_sets):
+        for keyword in keywords:
+            jd_terms[row, position[keyword]] = 1.0
+    term_counts = np.maximum(jd_terms.sum(axis=1), 1.0)
+    keyword_scores = np.round(resume_hits @ jd_terms.T / term_counts * 100, 2)
+
+    vectors = await aencode([" ".join(keywords) for keywords in keyword_sets] + list(resumes))
+    jd_matrix = np.vstack(vectors[:len(keyword_sets)]).astype(np.float64)
+    resume_matrix = np.vstack(vectors[len(keyword_sets):]).astype(np.float64)
+    similarity_scores = np.round(resume_matrix @ jd_matrix.T * 100, 2)
+
+    final_scores = np.round(keyword_scores * 0.6 + similarity_scores * 0.4, 2)
+    return final_scores, keyword_scores, similarity_scores
+
+async def ascore_batch(resumes, jd_keywords):
+    """Score many resumes against one keyword set, as ``evaluate_ats_score`` tuples."""
+    final, keyword, similarity = await ascore_matrix(resumes, [jd_keywords])
+    return [(float(f), float(k), float(s)) for f, k, s in zip(final[:, 0], keyword[:, 0], similarity[:, 0])]
+
+async def document_embedding(text):
+    """Embedding for a whole resume, as a plain list for storage alongside it."""
+    vector, = await aencode([text])
+    return vector.tolist()
+
+def seed_embedding(text, embedding):
+    embedding_cache.put_behind(text_hash(text, EMBEDDING_NAMESPACE), embedding)
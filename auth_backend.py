@@ -1,30 +1,32 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 from bson.objectid import ObjectId
 import random, string, os
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from cache import LRUCache
+from database import auth_users_collection as users_collection
+from passwords import hash_password, verify_and_update
+
 load_dotenv()
 
 # === CONFIG ===
 SECRET_KEY = os.getenv("SECRET_KEY", "secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 20
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-DB_NAME = "optimizecv"
-
-client = AsyncIOMotorClient(MONGO_URI)
-db = client[DB_NAME]
-users_collection = db["users"]
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 4096))
+# invalidate_principal only reaches this process's cache, so with several workers
+# this TTL is how long another worker may keep serving a changed user.
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 5))
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# (sub, iat) -> user document, so a burst of calls with one token costs one lookup.
+principal_cache = LRUCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
 
 # === MODELS ===
 class SignupRequest(BaseModel):
@@ -40,22 +42,23 @@ class Token(BaseModel):
     token_type: str
 
 # === UTILS ===
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
-
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    to_encode.update({"iat": now, "exp": now + (expires_delta or timedelta(minutes=15))})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def invalidate_principal(email: str):
+    """Call after any write to a user that get_current_user returns (verification, password).
+
+    Other workers see the change once their entry expires, within ``PRINCIPAL_CACHE_TTL_SECONDS``.
+    """
+    principal_cache.evict_where(lambda key: key[0] == email)
+
 # === SIGNUP ===
 @router.post("/signup")
 async def signup(user: SignupRequest):
-    existing = await users_collection.find_one({"email": user.email})
+    existing = await users_collection.find_one({"email": user.email}, {"_id": 1})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -63,11 +66,14 @@ async def signup(user: SignupRequest):
 
     user_data = {
         "email": user.email,
-        "password": get_password_hash(user.password),
+        "password": await hash_password(user.password),
         "is_verified": False,
         "otp": otp,
     }
-    await users_collection.insert_one(user_data)
+    try:
+        await users_collection.insert_one(user_data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
 
     print(f"[DEBUG] OTP sent to {user.email}: {otp}")  # Replace with email logic
 
@@ -76,22 +82,31 @@ async def signup(user: SignupRequest):
 # === OTP VERIFICATION ===
 @router.post("/verify-otp")
 async def verify_otp(data: OTPVerifyRequest):
-    user = await users_collection.find_one({"email": data.email})
+    user = await users_collection.find_one({"email": data.email}, {"otp": 1})
     if not user or user.get("otp") != data.otp:
         raise HTTPException(status_code=400, detail="Invalid OTP")
 
     await users_collection.update_one(
         {"email": data.email}, {"$set": {"is_verified": True}, "$unset": {"otp": ""}}
     )
+    invalidate_principal(data.email)
 
     return {"message": "Email verified successfully"}
 
 # === LOGIN ===
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = await users_collection.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["password"]):
+    user = await users_collection.find_one(
+        {"email": form_data.username}, {"email": 1, "password": 1, "is_verified": 1}
+    )
+    if not user:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    valid, new_hash = await verify_and_update(form_data.password, user["password"])
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        await users_collection.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+        invalidate_principal(user["email"])
     if not user.get("is_verified"):
         raise HTTPException(status_code=403, detail="Please verify your email first.")
 
@@ -99,20 +114,31 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     return {"access_token": access_token, "token_type": "bearer"}
 
 # === CURRENT USER ===
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)):
+    """Verified JWT claims with no DB lookup, for endpoints that only need the subject."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        user = await users_collection.find_one({"email": email})
-        if user is None:
-            raise credentials_exception
-        return user
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+async def get_current_user(claims: dict = Depends(get_token_claims)):
+    email = claims["sub"]
+    key = (email, claims.get("iat"))
+    user = principal_cache.get(key)
+    if user is None:
+        # Credentials never leave the auth routes.
+        user = await users_collection.find_one({"email": email}, {"password": 0, "otp": 0})
+        if user is None:
+            raise _credentials_exception()
+        principal_cache.set(key, user)
+    return dict(user)
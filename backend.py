@@ -1,26 +1,33 @@
-from fastapi import FastAPI, UploadFile, Form, HTTPException
+from fastapi import FastAPI, UploadFile, Form, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
-from typing import Optional
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import asyncio
+import json
 import logging
-from models import SignupModel, LoginModel, RequestOTPModel
-from database import users_collection
-from utils import generate_otp, send_otp_email, store_otp, verify_otp
-from passlib.context import CryptContext
+import os
+from typing import Optional
+from models import SignupModel, LoginModel, RequestOTPModel, BatchATSScoreModel
+from database import ensure_user_indexes, users_collection
+from pymongo.errors import DuplicateKeyError
+from utils import email_dispatcher, generate_otp, otp_store, send_otp_email, store_otp, verify_otp
 from bson.objectid import ObjectId
 
 
-import fitz  # PyMuPDF
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Spacer, Paragraph
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-
-from ats_utils import extract_keywords, evaluate_ats_score 
-from ai_agent import get_rewritten_resume
+import ats_utils
+import ai_agent
+from ats_utils import extract_keywords, aevaluate_ats_score, ascore_matrix, embedding_service
+from ai_agent import get_rewritten_resume, stream_rewritten_resume
+from document_store import create_document_store
+from email_dispatcher import EmailQueueFull
+from extraction_cache import content_hash, create_extraction_cache, extraction_key
+from llm_scheduler import LLMUnavailableError, scheduler
+from resume_parser import ParsedResume, parse_document
+import exporters
+import jobs
+import passwords
+import pdf_extract
+import pdf_render
+from pdf_extract import PDFExtractionError
 
 app = FastAPI(title="OptiCV Resume Optimizer")
 
@@ -32,74 +39,258 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-resume_text_global: Optional[str] = None
-rewritten_resume_global: Optional[str] = None
+document_store = create_document_store()
+extraction_cache = create_extraction_cache()
+job_queue = jobs.JobQueue(jobs.create_job_store())
+
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "false").lower() == "true"
+WARMUP_RETRY_BASE_SECONDS = float(os.getenv("WARMUP_RETRY_BASE_SECONDS", 5))
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", 300))
+# Resumes scored per step when /ats-score/batch streams its results.
+BATCH_STREAM_CHUNK_SIZE = int(os.getenv("BATCH_STREAM_CHUNK_SIZE", 16))
+
+
+@app.on_event("startup")
+async def init_storage():
+    await ensure_user_indexes()
+    await document_store.ensure_indexes()
+    await ai_agent.response_cache.ensure_indexes()
+    await extraction_cache.ensure_indexes()
+    await otp_store.ensure_indexes()
+    otp_store.start()
+    email_dispatcher.start()
+    await job_queue.store.ensure_indexes()
+    job_queue.start()
+    pdf_render.init()
+
+
+def _warm_up_models():
+    ats_utils.warm_up()
+    ai_agent.warm_up()
+
+
+warmup = {"attempts": 0, "error": None, "task": None}
+
+
+async def _warm_up_until_ready():
+    # A failed warm-up (model download, network blip) is retried with backoff
+    # rather than leaving /ready at 503 for the life of the process.
+    while True:
+        warmup["attempts"] += 1
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, _warm_up_models)
+        except Exception as e:
+            warmup["error"] = str(e)
+            delay = min(WARMUP_RETRY_MAX_SECONDS, WARMUP_RETRY_BASE_SECONDS * 2 ** (warmup["attempts"] - 1))
+            logging.error(f"Model warm-up failed (attempt {warmup['attempts']}): {e}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        else:
+            warmup["error"] = None
+            logging.info("Model warm-up complete")
+            return
+
 
+@app.on_event("startup")
+async def warm_up_models():
+    # Runs in the background so the worker starts serving immediately.
+    if WARMUP_MODELS:
+        warmup["task"] = asyncio.ensure_future(_warm_up_until_ready())
 
 
+@app.get("/ready")
+async def ready():
+    models = {
+        "similarity_model": ats_utils.is_model_loaded(),
+        "llm_clients": ai_agent.is_ready()
+    }
+    backend = ats_utils.SIMILARITY_BACKEND
+    if WARMUP_MODELS and not all(models.values()):
+        return JSONResponse(status_code=503, content={
+            "status": "warming_up", "models": models, "similarity_backend": backend,
+            "warmup_attempts": warmup["attempts"], "warmup_error": warmup["error"]
+        })
+    return {"status": "ready", "models": models, "similarity_backend": backend}
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    if warmup["task"] is not None:
+        warmup["task"].cancel()
+    await job_queue.stop()
+    pdf_extract.shutdown()
+    pdf_render.shutdown()
+    passwords.shutdown()
+    await asyncio.to_thread(ats_utils.embedding_cache.close)
+    await otp_store.stop()
+    await email_dispatcher.stop()
+    await embedding_service.stop()
+
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "password_hashing": passwords.stats(),
+        "email": email_dispatcher.stats(),
+        "jobs": job_queue.stats(),
+        "llm": scheduler.stats(),
+        "llm_cache": ai_agent.response_cache.stats(),
+    }
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 @app.post("/request-otp")
 async def request_otp(data: RequestOTPModel):
     # ✅ Fix: await the DB call!
-    existing_user = await users_collection.find_one({"email": data.email})
+    existing_user = await users_collection.find_one({"email": data.email}, {"_id": 1})
     if existing_user:
         raise HTTPException(status_code=400, detail="User already signed up. Please log in.")
 
     otp = generate_otp()
     try:
+        await store_otp(data.email, otp)
+        # Only queues the message, so the response doesn't wait on the SMTP round trip.
         send_otp_email(data.email, otp)
-        store_otp(data.email, otp)
         return {"message": f"OTP sent to {data.email}"}
+    except EmailQueueFull:
+        raise HTTPException(status_code=503, detail="Too many pending emails, try again shortly.", headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send OTP: {str(e)}")
 
 @app.post("/signup")
 async def signup(data: SignupModel):
-    user = await users_collection.find_one({"email": data.email})
+    user = await users_collection.find_one({"email": data.email}, {"_id": 1})
     if user:
         raise HTTPException(status_code=400, detail="User already exists")
 
-    if not verify_otp(data.email, data.otp):
+    if not await verify_otp(data.email, data.otp):
         raise HTTPException(status_code=400, detail="Invalid OTP")
 
-    hashed_password = pwd_context.hash(data.password)
-    await users_collection.insert_one({
-        "email": data.email,
-        "password": hashed_password
-    })
+    hashed_password = await passwords.hash_password(data.password)
+    try:
+        await users_collection.insert_one({
+            "email": data.email,
+            "password": hashed_password
+        })
+    except DuplicateKeyError:
+        # A concurrent signup for the same email won the race.
+        raise HTTPException(status_code=400, detail="User already exists")
     return {"message": "User registered successfully"}
 
 @app.post("/login")
 async def login(data: LoginModel):
-    user = await users_collection.find_one({"email": data.email})
-    if not user or not pwd_context.verify(data.password, user["password"]):
+    user = await users_collection.find_one({"email": data.email}, {"password": 1})
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    valid, new_hash = await passwords.verify_and_update(data.password, user["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made; upgrade it transparently.
+        await users_collection.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
     return {"message": "Login successful"}
 
 
+async def _cache_document_embedding(key, entry):
+    try:
+        entry["embedding"] = await ats_utils.document_embedding(entry["resume_text"])
+        entry["embedding_namespace"] = ats_utils.EMBEDDING_NAMESPACE
+        await extraction_cache.set(key, entry)
+    except Exception as e:
+        logging.warning(f"Could not precompute resume embedding: {e}")
+
 @app.post("/upload")
-async def upload_resume(resume: UploadFile, jd: str = Form(...)):
-    global resume_text_global
+async def upload_resume(
+    background_tasks: BackgroundTasks,
+    resume: UploadFile,
+    jd: str = Form(...),
+    mode: Optional[str] = Form(None)
+):
+    mode = mode or pdf_extract.PDF_EXTRACTION_MODE
+    if mode not in pdf_extract.EXTRACTION_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown extraction mode: {mode}")
     contents = await resume.read()
-    pdf = fitz.open(stream=contents, filetype="pdf")
-    extracted_text = "\n".join([page.get_text() for page in pdf])
-    resume_text_global = extracted_text
+    digest = content_hash(contents)
+    key = extraction_key(digest, mode)
+
+    entry = await extraction_cache.get(key)
+    cached = entry is not None
+    if cached:
+        if entry.get("embedding") and entry.get("embedding_namespace") == ats_utils.EMBEDDING_NAMESPACE:
+            ats_utils.seed_embedding(entry["resume_text"], entry["embedding"])
+        else:
+            # The first upload's background encode failed or used another model; fill it in now.
+            background_tasks.add_task(_cache_document_embedding, key, dict(entry))
+    else:
+        try:
+            if mode == "layout":
+                extracted_text, parsed = await pdf_extract.extract_layout(contents)
+                entry = {"resume_text": extracted_text, "sections": parsed.to_dict()}
+            else:
+                entry = {"resume_text": await pdf_extract.extract_text(contents), "sections": None}
+        except PDFExtractionError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        await extraction_cache.set(key, entry)
+        background_tasks.add_task(_cache_document_embedding, key, dict(entry))
+
+    extracted_text = entry["resume_text"]
+    document_id = await document_store.create(
+        resume_text=extracted_text, sections=entry.get("sections"), content_hash=digest
+    )
 
     return {
         "message": "Resume uploaded successfully",
+        "document_id": document_id,
+        "cached": cached,
         "resume_text": extracted_text,
         "job_description": jd
     }
 
+@app.post("/upload/stream")
+async def upload_resume_stream(resume: UploadFile, jd: str = Form(...)):
+    contents = await resume.read()
+    try:
+        pdf_extract.check_size(contents)
+    except PDFExtractionError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    jd_keywords = extract_keywords(jd)
+
+    async def score_event(pages):
+        final_score, keyword_score, similarity_score = await aevaluate_ats_score("\n".join(pages), jd_keywords)
+        return json.dumps({
+            "type": "score",
+            "pages_parsed": len(pages),
+            "ats_score": final_score,
+            "keyword_score": keyword_score,
+            "similarity_score": similarity_score
+        }) + "\n"
+
+    async def events():
+        pages = []
+        try:
+            async for page_number, text in pdf_extract.iter_pages(contents):
+                pages.append(text)
+                yield json.dumps({"type": "page", "page": page_number, "text": text}) + "\n"
+                if len(pages) % pdf_extract.PDF_STREAM_CHUNK_PAGES == 0:
+                    yield await score_event(pages)
+        except PDFExtractionError as e:
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+            return
+        # A short last chunk still gets a score for the whole document.
+        if pages and len(pages) % pdf_extract.PDF_STREAM_CHUNK_PAGES:
+            yield await score_event(pages)
+
+        document_id = await document_store.create(resume_text="\n".join(pages))
+        yield json.dumps({"type": "done", "document_id": document_id, "page_count": len(pages)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.post("/ats-score")
-async def ats_score(jd: str = Form(...)):
-    if not resume_text_global:
+async def ats_score(jd: str = Form(...), document_id: str = Form(...)):
+    document = await document_store.get(document_id)
+    if not document or not document.get("resume_text"):
         return JSONResponse(status_code=400, content={"error": "Upload resume first."})
 
     jd_keywords = extract_keywords(jd)
-    final_score, keyword_score, similarity_score = evaluate_ats_score(resume_text_global, jd_keywords)
+    final_score, keyword_score, similarity_score = await aevaluate_ats_score(document["resume_text"], jd_keywords)
 
     return {
         "ats_score": final_score,
@@ -107,140 +298,277 @@ async def ats_score(jd: str = Form(...)):
         "similarity_score": similarity_score
     }
 
+@app.post("/ats-score/batch")
+async def ats_score_batch(data: BatchATSScoreModel):
+    if not data.job_descriptions:
+        raise HTTPException(status_code=400, detail="Provide at least one job description.")
+
+    documents = await asyncio.gather(*(document_store.get(doc_id) for doc_id in data.document_ids))
+    missing = [doc_id for doc_id, doc in zip(data.document_ids, documents) if not doc or not doc.get("resume_text")]
+    resume_ids = [doc_id for doc_id in data.document_ids if doc_id not in missing]
+    resumes = [doc["resume_text"] for doc in documents if doc and doc.get("resume_text")]
+    resume_ids += [f"resume-{i}" for i in range(len(data.resumes))]
+    resumes += data.resumes
+    if not resumes:
+        raise HTTPException(status_code=400, detail="No resumes to score.")
+
+    keyword_sets = [extract_keywords(jd) for jd in data.job_descriptions]
+
+    def score_results(ids, final, keyword, similarity):
+        return [
+            {
+                "resume_id": ids[row],
+                "jd_index": col,
+                "ats_score": float(final[row, col]),
+                "keyword_score": float(keyword[row, col]),
+                "similarity_score": float(similarity[row, col])
+            }
+            for row in range(len(ids))
+            for col in range(len(keyword_sets))
+        ]
+
+    def ranked(results):
+        results = sorted(results, key=lambda r: r["ats_score"], reverse=True)
+        return results[:data.top_k] if data.top_k else results
+
+    if data.stream:
+        async def events():
+            # Score a chunk of resumes at a time so results go out as they are computed;
+            # the ranking needs every score, so it comes last.
+            results = []
+            for start in range(0, len(resumes), BATCH_STREAM_CHUNK_SIZE):
+                chunk = slice(start, start + BATCH_STREAM_CHUNK_SIZE)
+                scores = await ascore_matrix(resumes[chunk], keyword_sets)
+                for result in score_results(resume_ids[chunk], *scores):
+                    results.append(result)
+                    yield json.dumps({"type": "result", **result}) + "\n"
+            yield json.dumps({
+                "type": "done",
+                "ranking": [
+                    {"rank": rank, "resume_id": r["resume_id"], "jd_index": r["jd_index"], "ats_score": r["ats_score"]}
+                    for rank, r in enumerate(ranked(results), start=1)
+                ],
+                "missing_document_ids": missing
+            }) + "\n"
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    results = ranked(score_results(resume_ids, *await ascore_matrix(resumes, keyword_sets)))
+    return {"results": results, "missing_document_ids": missing}
+
+def _parsed_sections(document):
+    # Present when the upload used layout extraction; the agent then skips its text heuristics.
+    sections = document.get("sections")
+    return ParsedResume.from_dict(sections) if sections else None
+
+async def _save_rewrite(document_id, rewritten_resume, rewrite_state):
+    await document_store.update(
+        document_id, rewritten_resume=rewritten_resume, rewrite_state=rewrite_state,
+        rewritten_document=parse_document(rewritten_resume).to_dict()
+    )
+
 @app.post("/rewrite")
-async def rewrite_resume(jd: str = Form(...)):
-    global rewritten_resume_global
-    if not resume_text_global:
+async def rewrite_resume(
+    jd: str = Form(...),
+    document_id: str = Form(...),
+    use_cache: bool = Form(True),
+    resume_text: Optional[str] = Form(None)
+):
+    document = await document_store.get(document_id)
+    if not document or not document.get("resume_text"):
         return JSONResponse(status_code=400, content={"error": "Upload resume first."})
+    if resume_text is not None and resume_text != document["resume_text"]:
+        # An edited resume keeps the document's rewrite state, so only changed sections are re-sent.
+        document["resume_text"] = resume_text
+        document["sections"] = None
+        await document_store.update(document_id, resume_text=resume_text, sections=None)
 
-    rewritten_resume = await get_rewritten_resume(resume_text_global, jd)
-    rewritten_resume_global = rewritten_resume
+    rewrite_state = document.get("rewrite_state") or {}
+    try:
+        rewritten_resume = await get_rewritten_resume(
+            document["resume_text"], jd, use_cache=use_cache, state=rewrite_state,
+            parsed=_parsed_sections(document)
+        )
+    except LLMUnavailableError as e:
+        headers = {"Retry-After": str(int(e.retry_after))} if e.retry_after else None
+        raise HTTPException(status_code=503, detail=f"Resume optimization unavailable: {e}", headers=headers)
+    await _save_rewrite(document_id, rewritten_resume, rewrite_state)
 
     jd_keywords = extract_keywords(jd)
 
    
-    final_score, keyword_score, similarity_score = evaluate_ats_score(rewritten_resume, jd_keywords)
+    final_score, keyword_score, similarity_score = await aevaluate_ats_score(rewritten_resume, jd_keywords)
 
     return {
         "rewritten_resume": rewritten_resume,
         "ats_score": final_score
     }
 
-@app.get("/generate-ats-pdf")
-async def generate_ats_pdf():
-    if not rewritten_resume_global:
-        return JSONResponse(status_code=400, content={"error": "No resume to convert"})
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/rewrite/stream")
+async def rewrite_resume_stream(
+    jd: str = Form(...),
+    document_id: str = Form(...),
+    use_cache: bool = Form(True),
+    resume_text: Optional[str] = Form(None)
+):
+    document = await document_store.get(document_id)
+    if not document or not document.get("resume_text"):
+        return JSONResponse(status_code=400, content={"error": "Upload resume first."})
+    if resume_text is not None and resume_text != document["resume_text"]:
+        # An edited resume keeps the document's rewrite state, so only changed sections are re-sent.
+        document["resume_text"] = resume_text
+        document["sections"] = None
+        await document_store.update(document_id, resume_text=resume_text, sections=None)
+
+    async def events():
+        rewritten_resume = None
+        rewrite_state = document.get("rewrite_state") or {}
+        try:
+            async for event in stream_rewritten_resume(
+                document["resume_text"], jd, use_cache=use_cache, state=rewrite_state,
+                parsed=_parsed_sections(document)
+            ):
+                name = event.pop("event")
+                if name == "resume":
+                    rewritten_resume = event["rewritten_resume"]
+                yield _sse(name, event)
+        except LLMUnavailableError as e:
+            yield _sse("error", {"error": f"Resume optimization unavailable: {e}"})
+            return
+
+        await _save_rewrite(document_id, rewritten_resume, rewrite_state)
+        final_score, keyword_score, similarity_score = await aevaluate_ats_score(rewritten_resume, extract_keywords(jd))
+        yield _sse("score", {
+            "ats_score": final_score,
+            "keyword_score": keyword_score,
+            "similarity_score": similarity_score
+        })
 
-    buffer = BytesIO()
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    try:
-        pdfmetrics.registerFont(TTFont('Arial', 'Arial.ttf'))
-        pdfmetrics.registerFont(TTFont('Arial-Bold', 'Arial Bold.ttf'))
-        base_font = 'Arial'
-    except Exception as e:
-        base_font = 'Helvetica'
-        logging.warning(f"Arial font not found - falling back to Helvetica. Error: {str(e)}")
-
-    styles = {
-        'title': ParagraphStyle(
-            name='Title',
-            fontName=f'{base_font}-Bold' if base_font == 'Arial' else 'Helvetica-Bold',
-            fontSize=14,
-            leading=16,
-            spaceAfter=12,
-            alignment=1  
-        ),
-        'section': ParagraphStyle(
-            name='Section',
-            fontName=f'{base_font}-Bold' if base_font == 'Arial' else 'Helvetica-Bold',
-            fontSize=12,
-            leading=14,
-            spaceAfter=8,
-            textTransform='uppercase',
-            alignment=1 
-        ),
-        'bullet': ParagraphStyle(
-            name='Bullet',
-            fontName=base_font,
-            fontSize=11,
-            leading=13,
-            leftIndent=10,
-            bulletIndent=5,
-            spaceBefore=4,
-            spaceAfter=4,
-            alignment=1 
-        ),
-        'normal': ParagraphStyle(
-            name='Normal',
-            fontName=base_font,
-            fontSize=11,
-            leading=13,
-            spaceAfter=6,
-            alignment=1  
-        ),
-        'footer': ParagraphStyle(
-            name='Footer',
-            fontName=base_font,
-            fontSize=8,
-            leading=10,
-            alignment=1,  
-            textColor=colors.grey
-        ),
+async def _run_rewrite_job(params, report):
+    document_id = params["document_id"]
+    document = await document_store.get(document_id)
+    if not document or not document.get("resume_text"):
+        raise jobs.JobFailed("Document expired or has no resume text.")
+
+    rewrite_state = document.get("rewrite_state") or {}
+    rewritten_resume = None
+    sections_done = 0
+    async for event in stream_rewritten_resume(
+        document["resume_text"], params["jd"], use_cache=params["use_cache"], state=rewrite_state,
+        parsed=_parsed_sections(document)
+    ):
+        # Token events are too frequent to persist; progress moves per section.
+        if event["event"] == "section":
+            sections_done += 1
+            await report(stage="rewriting", sections_done=sections_done)
+        elif event["event"] == "resume":
+            rewritten_resume = event["rewritten_resume"]
+
+    await report(stage="scoring", sections_done=sections_done)
+    await _save_rewrite(document_id, rewritten_resume, rewrite_state)
+    final_score, keyword_score, similarity_score = await aevaluate_ats_score(rewritten_resume, extract_keywords(params["jd"]))
+    return {
+        "document_id": document_id,
+        "rewritten_resume": rewritten_resume,
+        "ats_score": final_score,
+        "keyword_score": keyword_score,
+        "similarity_score": similarity_score
     }
 
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=letter,
-        leftMargin=36,  
-        rightMargin=36,
-        topMargin=72, 
-        bottomMargin=36
+job_queue.register("rewrite", _run_rewrite_job)
+
+@app.post("/jobs/rewrite", status_code=202)
+async def submit_rewrite_job(
+    jd: str = Form(...),
+    document_id: str = Form(...),
+    use_cache: bool = Form(True),
+    callback_url: Optional[str] = Form(None)
+):
+    document = await document_store.get(document_id)
+    if not document or not document.get("resume_text"):
+        return JSONResponse(status_code=400, content={"error": "Upload resume first."})
+    if callback_url is not None:
+        try:
+            await asyncio.to_thread(jobs.validate_callback_url, callback_url)
+        except jobs.CallbackURLRejected as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+
+    job_id = await job_queue.submit(
+        "rewrite", {"document_id": document_id, "jd": jd, "use_cache": use_cache}, callback_url
+    )
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": jobs.QUEUED},
+        headers={"Location": f"/jobs/{job_id}"}
     )
-    
-    story = []
-    current_section = None
-    
-    
-    
-    for line in rewritten_resume_global.split('\n'):
-        line = line.strip()
-        if not line:
-            continue
-        if line.upper() in ['PROFESSIONAL SUMMARY', 'WORK EXPERIENCE', 
-                          'EDUCATION', 'TECHNICAL SKILLS', 'PROJECTS']:
-            current_section = line.upper()
-            story.append(Paragraph(f"<b>{current_section}</b>", styles['section']))
-            continue
-        
-        if line.startswith(('- ', '• ', '* ')):
-            story.append(Paragraph(f"• {line[2:]}", styles['bullet']))
-        elif any(x in line.lower() for x in ['@', 'linkedin.com', 'github.com']):
-            story.append(Paragraph(line, styles['normal']))
-        else:
-            story.append(Paragraph(line, styles['normal']))
 
-        story.append(Spacer(1, 4))  
-    def add_footer(canvas, doc):
-        canvas.saveState()
-        footer_text = f"Page {doc.page}"
-        canvas.setFont('Helvetica', 8)
-        canvas.drawString(270, 30, footer_text) 
-        canvas.restoreState()
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return jobs.job_view(job)
+
+def _etag_matches(if_none_match, etag):
+    """RFC 9110 If-None-Match: ``*`` or an exact entry of the list, compared weakly."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+async def _export_response(document, request, fmt):
+    rewritten_resume = document.get("rewritten_resume") if document else None
+    if not rewritten_resume:
+        return JSONResponse(status_code=400, content={"error": "No resume to convert"})
 
-    doc.build(story, onFirstPage=add_footer, onLaterPages=add_footer)
+    etag = f'"{exporters.etag(rewritten_resume, fmt)}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
 
-    buffer.seek(0)
-    
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
+    sections = document.get("rewritten_document")
+    parsed = ParsedResume.from_dict(sections) if sections else None
+    try:
+        content = await exporters.export(rewritten_resume, fmt, parsed)
+    except pdf_render.RenderQueueFull:
+        raise HTTPException(status_code=503, detail="PDF renderer is busy, try again shortly.", headers={"Retry-After": "5"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="PDF rendering timed out.")
+    except exporters.ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    exporter = exporters.EXPORTERS[fmt]
+    return Response(
+        content=content,
+        media_type=exporter.media_type,
         headers={
-            "Content-Disposition": "attachment; filename=ats_optimized_resume.pdf",
-            "Content-Type": "application/pdf",
-            "X-ATS-Optimized": "true" 
+            "Content-Disposition": f"attachment; filename=ats_optimized_resume.{exporter.extension}",
+            "X-ATS-Optimized": "true",
+            **cache_headers
         }
     )
 
+@app.get("/export")
+async def export_resume(document_id: str, request: Request, format: str = "pdf"):
+    if format not in exporters.EXPORTERS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"format must be one of: {', '.join(exporters.EXPORTERS)}"}
+        )
+    return await _export_response(await document_store.get(document_id), request, format)
+
+@app.get("/generate-ats-pdf")
+async def generate_ats_pdf(document_id: str, request: Request):
+    return await _export_response(await document_store.get(document_id), request, "pdf")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=9999)
@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with optional per-entry TTL and byte budget.
+
+    ``max_bytes`` is only enforced when a ``sizeof`` callable is given.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, max_bytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, expires_at, now):
+        return expires_at is not None and expires_at <= now
+
+    def _size(self, value):
+        return self.sizeof(value) if self.sizeof else 0
+
+    def _remove(self, key):
+        value, _ = self._data.pop(key)
+        self.nbytes -= self._size(value)
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if self._expired(expires_at, time.monotonic()):
+                self._remove(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = self._size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at)
+            self.nbytes += size
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self.nbytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._data)))
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            expires_at = self._data[key][1]
+            value = self._remove(key)
+        if self._expired(expires_at, time.monotonic()):
+            return default
+        return value
+
+    def sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, exp) in self._data.items() if self._expired(exp, now)]
+            for key in expired:
+                self._remove(key)
+        return len(expired)
+
+    def evict_where(self, predicate):
+        """Drop every entry whose key satisfies ``predicate``; O(n), for rare invalidations."""
+        with self._lock:
+            matched = [k for k in self._data if predicate(k)]
+            for key in matched:
+                self._remove(key)
+        return len(matched)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """Async two-tier cache: an in-process LRU over an optional Mongo collection.
+
+    Persistent-tier errors are logged and treated as misses.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, collection=None):
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.collection = collection
+        self.hits = 0
+        self.misses = 0
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, key: str):
+        value = self.memory.get(key)
+        if value is None and self.collection is not None:
+            try:
+                entry = await self.collection.find_one({"_id": key}, {"value": 1, "expires_at": 1})
+            except Exception as e:
+                logging.warning(f"Cache lookup failed: {e}")
+                entry = None
+            # The TTL monitor only runs once a minute, so check expiry here too.
+            if entry is not None and entry.get("expires_at", datetime.max) > datetime.utcnow():
+                value = entry["value"]
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value):
+        self.memory.set(key, value)
+        if self.collection is not None:
+            fields = {"value": value}
+            if self.ttl:
+                fields["expires_at"] = datetime.utcnow() + timedelta(seconds=self.ttl)
+            try:
+                await self.collection.update_one({"_id": key}, {"$set": fields}, upsert=True)
+            except Exception as e:
+                logging.warning(f"Cache write failed: {e}")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.memory)}
@@ -1,10 +1,48 @@
+import logging
+import os
+
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
-import os
+from pymongo.errors import PyMongoError
 
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
-client = AsyncIOMotorClient(MONGO_URI)
-db = client["optcv"]
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "optcv")
+# The token auth routes have always kept their accounts in a separate database.
+AUTH_DB_NAME = os.getenv("AUTH_DB_NAME", "optimizecv")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 5 * 60 * 1000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 20000))
+
+
+def create_client(uri: str = MONGO_URI) -> AsyncIOMotorClient:
+    """Build a Motor client with the pool and timeout settings from the environment."""
+    return AsyncIOMotorClient(
+        uri,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    )
+
+
+# One client per process; every module shares its connection pool.
+client = create_client()
+db = client[MONGO_DB_NAME]
 users_collection = db["users"]
+auth_users_collection = client[AUTH_DB_NAME]["users"]
+
+
+async def ensure_user_indexes():
+    for collection in (users_collection, auth_users_collection):
+        try:
+            await collection.create_index("email", unique=True)
+        except PyMongoError as e:
+            # Duplicate emails from the old racy signup, or Mongo unreachable; neither should stop the API.
+            logging.error(f"Could not create unique email index on {collection.full_name}: {e}")
@@ -0,0 +1,111 @@
+import copy
+import os
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from cache import LRUCache
+
+load_dotenv()
+
+DOCUMENT_STORE_BACKEND = os.getenv("DOCUMENT_STORE_BACKEND", "memory")
+DOCUMENT_TTL_SECONDS = int(os.getenv("DOCUMENT_TTL_SECONDS", 6 * 60 * 60))
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", 1024))
+
+
+def new_document_id() -> str:
+    return uuid.uuid4().hex
+
+
+class DocumentStore(ABC):
+    """Session-scoped storage for uploaded and rewritten resumes."""
+
+    @abstractmethod
+    async def create(self, **fields) -> str:
+        ...
+
+    @abstractmethod
+    async def get(self, document_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def update(self, document_id: str, **fields) -> bool:
+        ...
+
+    async def ensure_indexes(self):
+        pass
+
+
+class InMemoryDocumentStore(DocumentStore):
+    """Per-process LRU store; entries expire after ``ttl`` seconds.
+
+    Documents are deep-copied in and out, like Mongo round-trips them, so a
+    caller mutating nested state (``rewrite_state``) never touches the stored
+    copy or another request's.
+    """
+
+    def __init__(self, maxsize=DOCUMENT_CACHE_SIZE, ttl=DOCUMENT_TTL_SECONDS):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    async def create(self, **fields) -> str:
+        document_id = new_document_id()
+        self._cache.set(document_id, copy.deepcopy(fields))
+        return document_id
+
+    async def get(self, document_id: str) -> Optional[dict]:
+        document = self._cache.get(document_id)
+        return copy.deepcopy(document) if document is not None else None
+
+    async def update(self, document_id: str, **fields) -> bool:
+        document = self._cache.get(document_id)
+        if document is None:
+            return False
+        self._cache.set(document_id, {**document, **copy.deepcopy(fields)})
+        return True
+
+
+class MongoDocumentStore(DocumentStore):
+    """Shared store backed by a Mongo collection with a TTL index."""
+
+    def __init__(self, collection, ttl=DOCUMENT_TTL_SECONDS):
+        self.collection = collection
+        self.ttl = ttl
+
+    def _expires_at(self):
+        return datetime.utcnow() + timedelta(seconds=self.ttl)
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def create(self, **fields) -> str:
+        document_id = new_document_id()
+        await self.collection.insert_one({"_id": document_id, **fields, "expires_at": self._expires_at()})
+        return document_id
+
+    async def get(self, document_id: str) -> Optional[dict]:
+        # The TTL monitor only runs once a minute, so check expiry here too.
+        document = await self.collection.find_one(
+            {"_id": document_id, "expires_at": {"$gt": datetime.utcnow()}},
+            {"_id": 0, "expires_at": 0},
+        )
+        return document
+
+    async def update(self, document_id: str, **fields) -> bool:
+        # Match only live documents, so an update never revives one the TTL monitor hasn't reaped yet.
+        result = await self.collection.update_one(
+            {"_id": document_id, "expires_at": {"$gt": datetime.utcnow()}},
+            {"$set": {**fields, "expires_at": self._expires_at()}},
+        )
+        return result.matched_count > 0
+
+
+def create_document_store(backend: str = DOCUMENT_STORE_BACKEND) -> DocumentStore:
+    if backend == "memory":
+        return InMemoryDocumentStore()
+    if backend == "mongo":
+        from database import db
+        return MongoDocumentStore(db["documents"])
+    raise ValueError(f"Unknown DOCUMENT_STORE_BACKEND: {backend}")
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import random
+import smtplib
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", 2))
+EMAIL_QUEUE_SIZE = int(os.getenv("EMAIL_QUEUE_SIZE", 1000))
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", 3))
+EMAIL_BACKOFF_BASE = float(os.getenv("EMAIL_BACKOFF_BASE", 1))
+EMAIL_BACKOFF_MAX = float(os.getenv("EMAIL_BACKOFF_MAX", 30))
+EMAIL_TIMEOUT_SECONDS = float(os.getenv("EMAIL_TIMEOUT_SECONDS", 15))
+# Servers drop idle sessions after a few minutes; reconnect rather than hit a dead socket.
+EMAIL_CONNECTION_IDLE_SECONDS = float(os.getenv("EMAIL_CONNECTION_IDLE_SECONDS", 60))
+EMAIL_DRAIN_SECONDS = float(os.getenv("EMAIL_DRAIN_SECONDS", 5))
+# Turn off to deliver to a local stand-in server without STARTTLS.
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "true").lower() == "true"
+
+
+class EmailQueueFull(RuntimeError):
+    pass
+
+
+def _is_retryable(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        # Raised when every recipient was refused at RCPT; retry only if all refusals were transient.
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        # 4xx replies are transient by definition; 5xx (bad recipient, auth) are not.
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # SMTPException subclasses OSError, so rule out the protocol errors first.
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class _Connection:
+    """One worker's SMTP session, opened lazily and reused across messages."""
+
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+        self.smtp = None
+        self.last_used = 0.0
+
+    def _open(self):
+        d = self.dispatcher
+        smtp = smtplib.SMTP(d.host, d.port, timeout=d.timeout)
+        try:
+            if d.use_tls:
+                smtp.starttls()
+            if d.username and d.password:
+                smtp.login(d.username, d.password)
+        except Exception:
+            smtp.close()
+            raise
+        d.connections_opened += 1
+        return smtp
+
+    def _is_broken(self, error):
+        return isinstance(error, smtplib.SMTPServerDisconnected) or not isinstance(error, smtplib.SMTPException)
+
+    def send(self, message):
+        if self.smtp is not None and time.monotonic() - self.last_used > self.dispatcher.idle_seconds:
+            self.close()
+        reused = self.smtp is not None
+        if not reused:
+            self.smtp = self._open()
+        try:
+            self.smtp.send_message(message)
+        except OSError as e:
+            if not self._is_broken(e):
+                raise
+            self.close()
+            if not reused:
+                raise
+            # The server dropped a pooled session; one fresh connection before backing off.
+            self.smtp = self._open()
+            self.smtp.send_message(message)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                self.smtp.close()
+            self.smtp = None
+
+
+class EmailDispatcher:
+    """Background delivery: ``enqueue`` returns at once and workers send over pooled connections."""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=EMAIL_USE_TLS,
+                 workers=EMAIL_WORKERS, queue_size=EMAIL_QUEUE_SIZE, max_retries=EMAIL_MAX_RETRIES,
+                 timeout=EMAIL_TIMEOUT_SECONDS, idle_seconds=EMAIL_CONNECTION_IDLE_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.workers = workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self.queue = None
+        self.queue_size = queue_size
+        self._tasks = []
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.connections_opened = 0
+
+    def _queue(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+        return self.queue
+
+    def enqueue(self, message):
+        try:
+            self._queue().put_nowait(message)
+        except asyncio.QueueFull:
+            raise EmailQueueFull(f"{self.queue_size} emails already queued")
+
+    async def _deliver(self, connection, message):
+        attempt = 0
+        while True:
+            try:
+                await asyncio.to_thread(connection.send, message)
+                self.sent += 1
+                return
+            except Exception as e:
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    self.failed += 1
+                    logging.error(f"Email to {message['To']} failed: {e}")
+                    return
+                delay = min(EMAIL_BACKOFF_MAX, EMAIL_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+                logging.warning(f"Email to {message['To']} failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _worker(self):
+        queue = self._queue()
+        connection = _Connection(self)
+        try:
+            while True:
+                message = await queue.get()
+                try:
+                    await self._deliver(connection, message)
+                finally:
+                    queue.task_done()
+        finally:
+            connection.close()
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain=EMAIL_DRAIN_SECONDS):
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue().join(), drain)
+        except asyncio.TimeoutError:
+            logging.warning(f"Dropping {self.queue.qsize()} queued emails on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "connections_opened": self.connections_opened,
+        }
@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+from dotenv import load_dotenv
+
+from cache import LRUCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: persistence is disabled, see EmbeddingCache
+    fcntl = None
+
+load_dotenv()
+
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 50_000))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR")  # unset disables on-disk persistence
+
+
+def text_hash(text: str, namespace: str = "") -> str:
+    digest = hashlib.sha256(namespace.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class MemmapEmbeddingStore:
+    """Append-only on-disk store: a memory-mapped ``.npy`` matrix plus a key log.
+
+    Row ``i`` of ``embeddings.npy`` belongs to line ``i`` of ``keys.txt``.
+    Worker processes may share one directory: writers take an exclusive
+    ``flock`` and assign the next row from the key log's length, and every
+    process reads rows the others appended from the log on a miss.
+    """
+
+    def __init__(self, directory, initial_capacity=1024):
+        if fcntl is None:
+            raise RuntimeError("on-disk embedding cache needs fcntl file locks")
+        self.directory = directory
+        self.initial_capacity = initial_capacity
+        self._matrix_path = os.path.join(directory, "embeddings.npy")
+        self._keys_path = os.path.join(directory, "keys.txt")
+        self._lock_path = os.path.join(directory, "embeddings.lock")
+        self._lock = threading.Lock()
+        self._index = {}
+        self._rows = 0
+        self._keys_offset = 0
+        self._matrix = None
+        self._matrix_id = None
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._refresh()
+
+    @contextmanager
+    def _file_lock(self, mode):
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Index keys appended since the last refresh and remap a replaced matrix.
+
+        Caller holds the file lock.
+        """
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, "rb") as f:
+                f.seek(self._keys_offset)
+                data = f.read()
+            # A writer that died mid-line leaves a partial key; only complete lines count.
+            complete = data[: data.rfind(b"\n") + 1]
+            for key in complete.decode("utf-8").splitlines():
+                if key:
+                    self._index.setdefault(key, self._rows)
+                self._rows += 1
+            self._keys_offset += len(complete)
+        if os.path.exists(self._matrix_path):
+            stat = os.stat(self._matrix_path)
+            if (stat.st_ino, stat.st_size) != self._matrix_id:
+                self._matrix = np.load(self._matrix_path, mmap_mode="r+")
+                self._matrix_id = (stat.st_ino, stat.st_size)
+
+    def _ensure_capacity(self, rows, dim, dtype):
+        """Grow the matrix to hold ``rows`` rows; caller holds the exclusive file lock."""
+        if self._matrix is not None and rows <= len(self._matrix):
+            return
+        capacity = self.initial_capacity if self._matrix is None else 2 * len(self._matrix)
+        while capacity < rows:
+            capacity *= 2
+        if self._matrix is not None:
+            dim, dtype = self._matrix.shape[1], self._matrix.dtype
+        # Build the larger file beside the old one and swap it in, so other
+        # processes' maps of the old file stay valid until they refresh.
+        tmp_path = self._matrix_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(capacity, dim))
+        if self._matrix is not None:
+            grown[: len(self._matrix)] = self._matrix
+        grown.flush()
+        os.replace(tmp_path, self._matrix_path)
+        stat = os.stat(self._matrix_path)
+        self._matrix = grown
+        self._matrix_id = (stat.st_ino, stat.st_size)
+
+    def get(self, key):
+        with self._lock:
+            row = self._index.get(key)
+            if row is None:
+                with self._file_lock(fcntl.LOCK_SH):
+                    self._refresh()
+                row = self._index.get(key)
+                if row is None:
+                    return None
+            return np.array(self._matrix[row])
+
+    def put(self, key, vector):
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh()
+            if key in self._index:
+                return
+            row = self._rows
+            self._ensure_capacity(row + 1, vector.shape[-1], vector.dtype)
+            self._matrix[row] = vector
+            self._matrix.flush()
+            line = (key + "\n").encode("utf-8")
+            with open(self._keys_path, "ab") as f:
+                # Drop a partial line left by a crashed writer before appending.
+                f.truncate(self._keys_offset)
+                f.write(line)
+            self._keys_offset += len(line)
+            self._rows += 1
+            self._index[key] = row
+
+    def __len__(self):
+        return len(self._index)
+
+
+def _log_write_error(future):
+    if future.exception() is not None:
+        logging.warning(f"Embedding cache disk write failed: {future.exception()}")
+
+
+class EmbeddingCache:
+    """Content-hash keyed embedding cache: in-memory LRU over an optional disk store.
+
+    The disk tier takes file locks that wait on other worker processes, so
+    async callers use ``aget_many`` and ``put_behind``, which keep it off the
+    event loop; ``get`` and ``put`` are for code already on a worker thread.
+    """
+
+    def __init__(self, max_entries=EMBEDDING_CACHE_MAX_ENTRIES, max_bytes=EMBEDDING_CACHE_MAX_BYTES,
+                 directory=EMBEDDING_CACHE_DIR):
+        self.memory = LRUCache(maxsize=max_entries, max_bytes=max_bytes, sizeof=lambda v: v.nbytes)
+        self.disk = None
+        if directory:
+            try:
+                self.disk = MemmapEmbeddingStore(directory)
+            except Exception as e:
+                logging.warning(f"Embedding cache persistence disabled: {e}")
+        # One writer thread: the store serializes writes anyway, and queued
+        # writes then cannot tie up the default executor.
+        self._writer = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-disk") if self.disk is not None else None
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        vector = self.memory.get(key)
+        if vector is None and self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.memory.set(key, vector)
+        if vector is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vector
+
+    def put(self, key, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        self.memory.set(key, vector)
+        if self.disk is not None:
+            self.disk.put(key, vector)
+
+    async def aget_many(self, keys):
+        """``get`` for each key, reading every memory miss from disk in one worker thread."""
+        vectors = [self.memory.get(key) for key in keys]
+        absent = [key for key, vector in zip(keys, vectors) if vector is None]
+        if absent and self.disk is not None:
+            found = await asyncio.to_thread(lambda: {key: self.disk.get(key) for key in absent})
+            for i, key in enumerate(keys):
+                if vectors[i] is None and found.get(key) is not None:
+                    vectors[i] = found[key]
+                    self.memory.set(key, vectors[i])
+        for vector in vectors:
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return vectors
+
+    def put_behind(self, key, vector):
+        """``put`` that returns once the vector is in memory; the disk write happens on the writer thread."""
+        vector = np.asarray(vector, dtype=np.float32)
+        self.memory.set(key, vector)
+        if self.disk is not None:
+            self._writer.submit(self.disk.put, key, vector).add_done_callback(_log_write_error)
+
+    def close(self):
+        """Finish queued disk writes."""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.memory),
+            "bytes": self.memory.nbytes,
+            "disk_entries": len(self.disk) if self.disk is not None else 0,
+        }
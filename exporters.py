@@ -0,0 +1,113 @@
+import asyncio
+import unicodedata
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Callable, Optional
+
+import pdf_render
+from cache import LRUCache
+from resume_parser import ParsedResume, parse_document, split_bullet
+
+# Typographic characters some ATS parsers mangle, mapped to plain ASCII.
+ATS_SAFE_CHARACTERS = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "–": "-", "—": "-", "•": "-", " ": " ",
+})
+
+
+_exported = LRUCache(maxsize=pdf_render.PDF_RENDER_CACHE_SIZE, max_bytes=pdf_render.PDF_RENDER_CACHE_MAX_BYTES, sizeof=len)
+
+
+class ExportUnavailable(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Exporter:
+    media_type: str
+    extension: str
+    render: Optional[Callable[[ParsedResume], bytes]]
+
+
+def render_text(parsed: ParsedResume) -> bytes:
+    blocks = []
+    for section in parsed.sections:
+        lines = [section.header.upper()] if section.titled else []
+        for line in section.lines():
+            is_bullet, text = split_bullet(line)
+            lines.append(f"- {text}" if is_bullet else text)
+        blocks.append("\n".join(lines))
+    text = unicodedata.normalize("NFKC", "\n\n".join(blocks).translate(ATS_SAFE_CHARACTERS))
+    return (text + "\n").encode("utf-8")
+
+
+def render_markdown(parsed: ParsedResume) -> bytes:
+    blocks = []
+    for section in parsed.sections:
+        lines = section.lines()
+        if not section.titled and lines:
+            # The untitled leading block starts with the candidate's name.
+            blocks.append("\n".join([f"# {lines[0]}", ""] + [f"{line}  " for line in lines[1:]]))
+            continue
+        body = []
+        for line in lines:
+            is_bullet, text = split_bullet(line)
+            body.append(f"- {text}" if is_bullet else text)
+        blocks.append("\n".join([f"## {section.header}", ""] + body))
+    return ("\n\n".join(blocks) + "\n").encode("utf-8")
+
+
+def render_docx(parsed: ParsedResume) -> bytes:
+    try:
+        from docx import Document
+    except ImportError:
+        raise ExportUnavailable("DOCX export requires the python-docx package.")
+
+    document = Document()
+    for section in parsed.sections:
+        lines = section.lines()
+        if section.titled:
+            document.add_heading(section.header.upper(), level=1)
+        elif lines:
+            document.add_heading(lines[0], level=0)
+            lines = lines[1:]
+        for line in lines:
+            is_bullet, text = split_bullet(line)
+            document.add_paragraph(text, style="List Bullet" if is_bullet else None)
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+EXPORTERS = {
+    # PDF goes through pdf_render's process pool and rendered-output cache.
+    "pdf": Exporter("application/pdf", "pdf", None),
+    "docx": Exporter("application/vnd.openxmlformats-officedocument.wordprocessingml.document", "docx", render_docx),
+    "txt": Exporter("text/plain; charset=utf-8", "txt", render_text),
+    "md": Exporter("text/markdown; charset=utf-8", "md", render_markdown),
+}
+
+
+def export_key(resume_text: str, fmt: str) -> str:
+    return pdf_render.render_key(resume_text, template=f"{pdf_render.TEMPLATE}:{fmt}")
+
+
+def etag(resume_text: str, fmt: str) -> str:
+    return pdf_render.render_key(resume_text) if fmt == "pdf" else export_key(resume_text, fmt)
+
+
+async def export(resume_text: str, fmt: str, parsed: ParsedResume = None) -> bytes:
+    """Render ``resume_text`` in ``fmt``, one of ``EXPORTERS``.
+
+    Raises ``ExportUnavailable`` when the format's optional dependency is missing.
+    """
+    exporter = EXPORTERS[fmt]
+    if exporter.render is None:
+        return await pdf_render.render_async(resume_text, parsed)
+    key = export_key(resume_text, fmt)
+    data = _exported.get(key)
+    if data is None:
+        # python-docx builds a zip archive; keep it off the event loop.
+        data = await asyncio.to_thread(exporter.render, parsed or parse_document(resume_text))
+        _exported.set(key, data)
+    return data
@@ -0,0 +1,38 @@
+import hashlib
+import os
+
+from dotenv import load_dotenv
+
+from cache import TieredCache
+
+load_dotenv()
+
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", 512))
+EXTRACTION_CACHE_TTL_SECONDS = int(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", 30 * 24 * 60 * 60))
+EXTRACTION_CACHE_PERSIST = os.getenv("EXTRACTION_CACHE_PERSIST", "false").lower() == "true"
+
+
+def content_hash(contents: bytes) -> str:
+    return hashlib.sha256(contents).hexdigest()
+
+
+def extraction_key(digest: str, mode: str) -> str:
+    return f"{mode}:{digest}"
+
+
+class ExtractionCache(TieredCache):
+    """Extraction results for uploaded PDFs keyed by raw-byte hash and extraction mode.
+
+    Entries hold ``resume_text``, ``sections`` and, once computed,
+    ``embedding`` with the ``embedding_namespace`` it was produced under.
+    """
+
+    def __init__(self, maxsize=EXTRACTION_CACHE_SIZE, ttl=EXTRACTION_CACHE_TTL_SECONDS, collection=None):
+        super().__init__(maxsize=maxsize, ttl=ttl, collection=collection)
+
+
+def create_extraction_cache() -> ExtractionCache:
+    if EXTRACTION_CACHE_PERSIST:
+        from database import db
+        return ExtractionCache(collection=db["extractions"])
+    return ExtractionCache()
@@ -20,6 +20,7 @@ function App() {
   const [atsScore, setAtsScore] = useState(null);
   const [optimizedAtsScore, setOptimizedAtsScore] = useState(null); // New state
   const [rewrittenResume, setRewrittenResume] = useState("");
+  const [documentId, setDocumentId] = useState(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
 
   const [uploading, setUploading] = useState(false);
@@ -38,7 +39,8 @@ function App() {
 
     setUploading(true);
     try {
-      await axios.post(`${BASE_URL}/upload`, formData);
+      const res = await axios.post(`${BASE_URL}/upload`, formData);
+      setDocumentId(res.data.document_id);
       toast.success("Resume uploaded successfully!");
     } catch (error) {
       toast.error("Error uploading resume: " + error.message);
@@ -48,10 +50,11 @@ function App() {
   };
 
   const checkAtsScore = async () => {
-    if (!resumeFile || !jobDesc) return toast.error("Upload resume or enter Job Description");
+    if (!documentId || !jobDesc) return toast.error("Upload resume or enter Job Description");
 
     const formData = new FormData();
     formData.append("jd", jobDesc);
+    formData.append("document_id", documentId);
 
     setCheckingScore(true);
     try {
@@ -65,10 +68,11 @@ function App() {
   };
 
   const rewriteResume = async () => {
-    if (!resumeFile || !jobDesc) return toast.error("Upload resume or enter Job Description");
+    if (!documentId || !jobDesc) return toast.error("Upload resume or enter Job Description");
 
     const formData = new FormData();
     formData.append("jd", jobDesc);
+    formData.append("document_id", documentId);
 
     setRewriting(true);
     try {
@@ -88,7 +92,10 @@ function App() {
     if (!rewrittenResume) return toast.error("Please rewrite the resume first before downloading.");
     setDownloading(true);
     try {
-      const res = await axios.get(`${BASE_URL}/generate-ats-pdf`, { responseType: "blob" });
+      const res = await axios.get(`${BASE_URL}/generate-ats-pdf`, {
+        params: { document_id: documentId },
+        responseType: "blob",
+      });
       const url = window.URL.createObjectURL(new Blob([res.data]));
       const link = document.createElement("a");
       link.href = url;
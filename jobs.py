@@ -0,0 +1,473 @@
+import asyncio
+import ipaddress
+import logging
+import os
+import random
+import socket
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+
+from cache import LRUCache
+
+load_dotenv()
+
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "memory")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 120))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 24 * 60 * 60))
+JOB_CACHE_SIZE = int(os.getenv("JOB_CACHE_SIZE", 4096))
+# How often idle workers look for jobs submitted on other nodes.
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", 1))
+JOB_CALLBACK_TIMEOUT_SECONDS = float(os.getenv("JOB_CALLBACK_TIMEOUT_SECONDS", 10))
+JOB_CALLBACK_RETRIES = int(os.getenv("JOB_CALLBACK_RETRIES", 3))
+# Comma-separated hostnames; when set, callbacks may only go to these.
+JOB_CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+}
+JOB_RETRY_BACKOFF_BASE = float(os.getenv("JOB_RETRY_BACKOFF_BASE", 5))
+JOB_RETRY_BACKOFF_MAX = float(os.getenv("JOB_RETRY_BACKOFF_MAX", 300))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobFailed(RuntimeError):
+    """Raised by a handler for failures that retrying will not fix."""
+
+
+class CallbackURLRejected(ValueError):
+    pass
+
+
+def _is_public_address(address):
+    ip = ipaddress.ip_address(address)
+    return ip.is_global and not ip.is_multicast
+
+
+def validate_callback_url(url: str) -> str:
+    """Raise ``CallbackURLRejected`` unless ``url`` is http(s) and every address
+    its host resolves to is public, so callbacks cannot reach internal services.
+
+    Returns one of the checked addresses for the caller to connect to. Blocks
+    on DNS; call it from a thread.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise CallbackURLRejected("callback_url must be an http(s) URL.")
+    host = parts.hostname.lower()
+    if JOB_CALLBACK_ALLOWED_HOSTS and host not in JOB_CALLBACK_ALLOWED_HOSTS:
+        raise CallbackURLRejected(f"callback_url host {host} is not allowed.")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (OSError, ValueError) as e:
+        raise CallbackURLRejected(f"callback_url host {host} does not resolve: {e}")
+    # Drop IPv6 zone ids ("fe80::1%eth0"); ip_address does not accept them.
+    addresses = sorted(address.split("%", 1)[0] for address in addresses)
+    if not all(_is_public_address(address) for address in addresses):
+        raise CallbackURLRejected(f"callback_url host {host} resolves to a non-public address.")
+    return addresses[0]
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _new_job(kind, params, callback_url):
+    now = datetime.utcnow()
+    return {
+        "_id": new_job_id(),
+        "kind": kind,
+        "status": QUEUED,
+        "params": params,
+        "callback_url": callback_url,
+        "progress": {},
+        "result": None,
+        "error": None,
+        "attempts": 0,
+        "lease_expires_at": None,
+        # Claimable from this time on; pushed back when a failed attempt is retried.
+        "available_at": now,
+        "created_at": now,
+        "updated_at": now,
+        "expires_at": now + timedelta(seconds=JOB_TTL_SECONDS),
+    }
+
+
+def job_view(job: dict) -> dict:
+    """The client-facing shape of a job, for polling responses and callbacks."""
+    return {
+        "job_id": job["_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "result": job["result"],
+        "error": job["error"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"].isoformat(),
+        "updated_at": job["updated_at"].isoformat(),
+    }
+
+
+class JobStore(ABC):
+    """Persistent job state; ``claim`` hands each queued job to exactly one worker."""
+
+    @abstractmethod
+    async def create(self, kind: str, params: dict, callback_url: Optional[str] = None) -> str:
+        ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def claim(self, lease_seconds: int, max_attempts: int) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def update(self, job_id: str, attempt: Optional[int] = None, **fields) -> bool:
+        """Set ``fields`` on the job. With ``attempt``, only while claim number
+        ``attempt`` still holds it, so a worker that lost its lease cannot
+        overwrite the job's state."""
+
+    @abstractmethod
+    async def renew(self, job_id: str, attempt: int, lease_seconds: int) -> bool:
+        """Extend the lease taken by claim number ``attempt``; False once it is lost."""
+
+    async def ensure_indexes(self):
+        pass
+
+
+class InMemoryJobStore(JobStore):
+    """Per-process store; jobs do not survive a restart."""
+
+    def __init__(self, maxsize=JOB_CACHE_SIZE, ttl=JOB_TTL_SECONDS):
+        self._jobs = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._queued = deque()
+
+    async def create(self, kind, params, callback_url=None):
+        job = _new_job(kind, params, callback_url)
+        self._jobs.set(job["_id"], job)
+        self._queued.append(job["_id"])
+        return job["_id"]
+
+    async def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    async def claim(self, lease_seconds, max_attempts):
+        now = datetime.utcnow()
+        for _ in range(len(self._queued)):
+            job_id = self._queued.popleft()
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != QUEUED:
+                continue
+            if job["available_at"] is not None and job["available_at"] > now:
+                # Backing off after a failure; keep its place for a later claim.
+                self._queued.append(job_id)
+                continue
+            job.update(
+                status=RUNNING,
+                attempts=job["attempts"] + 1,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                updated_at=now,
+            )
+            return dict(job)
+        return None
+
+    async def update(self, job_id, attempt=None, **fields):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        if attempt is not None and (job["status"] != RUNNING or job["attempts"] != attempt):
+            return False
+        job.update(fields, updated_at=datetime.utcnow())
+        if fields.get("status") == QUEUED:
+            self._queued.append(job_id)
+        return True
+
+    async def renew(self, job_id, attempt, lease_seconds):
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != RUNNING or job["attempts"] != attempt:
+            return False
+        job.update(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        return True
+
+
+class MongoJobStore(JobStore):
+    """Shared store: any node's workers can claim a job, and a job whose
+    lease lapses (its worker died) is claimed again up to ``max_attempts``."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.create_index([("status", 1), ("created_at", 1)])
+
+    async def create(self, kind, params, callback_url=None):
+        job = _new_job(kind, params, callback_url)
+        await self.collection.insert_one(job)
+        return job["_id"]
+
+    async def get(self, job_id):
+        return await self.collection.find_one({"_id": job_id})
+
+    async def claim(self, lease_seconds, max_attempts):
+        now = datetime.utcnow()
+        abandoned = {"status": RUNNING, "lease_expires_at": {"$lt": now}}
+        await self.collection.update_many(
+            {**abandoned, "attempts": {"$gte": max_attempts}},
+            {"$set": {"status": FAILED, "error": "Worker lost the job too many times.", "updated_at": now}},
+        )
+        # $not also matches jobs stored before available_at existed.
+        queued = {"status": QUEUED, "available_at": {"$not": {"$gt": now}}}
+        return await self.collection.find_one_and_update(
+            {"$or": [queued, abandoned], "attempts": {"$lt": max_attempts}},
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def update(self, job_id, attempt=None, **fields):
+        query = {"_id": job_id}
+        if attempt is not None:
+            query.update(status=RUNNING, attempts=attempt)
+        result = await self.collection.update_one(
+            query, {"$set": {**fields, "updated_at": datetime.utcnow()}}
+        )
+        return result.matched_count > 0
+
+    async def renew(self, job_id, attempt, lease_seconds):
+        # Matching on attempts fails once the lease lapsed and another worker re-claimed the job.
+        result = await self.collection.update_one(
+            {"_id": job_id, "status": RUNNING, "attempts": attempt},
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)}},
+        )
+        return result.matched_count > 0
+
+
+def create_job_store(backend: str = JOB_STORE_BACKEND) -> JobStore:
+    if backend == "memory":
+        return InMemoryJobStore()
+    if backend == "mongo":
+        from database import db
+        return MongoJobStore(db["jobs"])
+    raise ValueError(f"Unknown JOB_STORE_BACKEND: {backend}")
+
+
+class _PinnedHostAdapter(HTTPAdapter):
+    """Sends TLS SNI and checks the certificate for ``hostname`` while the URL names an IP."""
+
+    def __init__(self, hostname):
+        self.hostname = hostname
+        super().__init__()
+
+    def init_poolmanager(self, *args, **kwargs):
+        # urllib3 drops both keywords for plain http pools.
+        kwargs.update(server_hostname=self.hostname, assert_hostname=self.hostname)
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _post_callback(url, payload):
+    # Connect to the address that was just checked rather than letting requests
+    # resolve the host again, which a rebinding DNS server could answer with an
+    # internal address. A redirect could point anywhere, so none are followed.
+    address = validate_callback_url(url)
+    parts = urlsplit(url)
+    port = f":{parts.port}" if parts.port else ""
+    pinned = f"[{address}]" if ":" in address else address
+    with requests.Session() as session:
+        session.mount(f"{parts.scheme}://", _PinnedHostAdapter(parts.hostname))
+        response = session.post(
+            urlunsplit(parts._replace(netloc=pinned + port)),
+            json=payload,
+            headers={"Host": parts.hostname + port},
+            timeout=JOB_CALLBACK_TIMEOUT_SECONDS,
+            allow_redirects=False,
+        )
+    response.raise_for_status()
+
+
+class JobQueue:
+    """Worker pool that runs registered handlers for jobs in a ``JobStore``.
+
+    A handler is ``async fn(params, report) -> result``; ``report(**progress)``
+    records progress on the job. While it runs, the job's lease is renewed.
+    """
+
+    def __init__(self, store: JobStore, workers=JOB_WORKERS, lease_seconds=JOB_LEASE_SECONDS,
+                 max_attempts=JOB_MAX_ATTEMPTS):
+        self.store = store
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.handlers = {}
+        self._tasks = []
+        self._callbacks = set()
+        self._wakeup = None
+        self.succeeded = 0
+        self.failed = 0
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    async def submit(self, kind: str, params: dict, callback_url: Optional[str] = None) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = await self.store.create(kind, params, callback_url)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def _renew_lease(self, job, handler):
+        """Keep ``job``'s lease alive; cancel ``handler`` and return True once it is lost."""
+        job_id = job["_id"]
+        expires = job["lease_expires_at"]
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await self.store.renew(job_id, job["attempts"], self.lease_seconds)
+            except Exception as e:
+                logging.warning(f"Lease renewal for job {job_id} failed: {e}")
+                # The current lease still holds; try again until it runs out.
+                renewed = datetime.utcnow() < expires
+            else:
+                if renewed:
+                    expires = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+            if not renewed:
+                logging.error(f"Job {job_id} lost its lease; stopping it")
+                handler.cancel()
+                return True
+
+    async def _notify(self, job_id):
+        try:
+            job = await self.store.get(job_id)
+        except Exception as e:
+            logging.warning(f"Callback for job {job_id} skipped, job lookup failed: {e}")
+            return
+        url = job.get("callback_url") if job else None
+        if not url:
+            return
+        for attempt in range(JOB_CALLBACK_RETRIES):
+            try:
+                await asyncio.to_thread(_post_callback, url, job_view(job))
+                return
+            except Exception as e:
+                logging.warning(f"Callback for job {job_id} failed (attempt {attempt + 1}): {e}")
+                if attempt + 1 < JOB_CALLBACK_RETRIES:
+                    await asyncio.sleep(2 ** attempt)
+
+    def _schedule_notify(self, job_id):
+        # Delivery runs beside the workers so a slow callback host does not hold a job slot.
+        task = asyncio.ensure_future(self._notify(job_id))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    def _retry_delay(self, attempts):
+        delay = min(JOB_RETRY_BACKOFF_MAX, JOB_RETRY_BACKOFF_BASE * 2 ** (attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+    async def _run(self, job):
+        job_id = job["_id"]
+
+        attempt = job["attempts"]
+
+        async def report(**progress):
+            await self.store.update(job_id, attempt=attempt, progress=progress)
+
+        handler = asyncio.ensure_future(self.handlers[job["kind"]](job["params"], report))
+        renewer = asyncio.ensure_future(self._renew_lease(job, handler))
+        try:
+            result = await handler
+        except asyncio.CancelledError:
+            if renewer.done() and not renewer.cancelled():
+                # Lost the lease: the job is another worker's now, or gone.
+                return
+            # Shutting down: hand the job back instead of waiting for the lease to lapse.
+            await self.store.update(
+                job_id, attempt=attempt, status=QUEUED, lease_expires_at=None, available_at=datetime.utcnow()
+            )
+            raise
+        except Exception as e:
+            retry = not isinstance(e, JobFailed) and attempt < self.max_attempts
+            logging.error(f"Job {job_id} failed (attempt {attempt}): {e}")
+            if retry:
+                await self.store.update(
+                    job_id, attempt=attempt, status=QUEUED, error=str(e), lease_expires_at=None,
+                    available_at=datetime.utcnow() + self._retry_delay(attempt),
+                )
+                return
+            if not await self.store.update(job_id, attempt=attempt, status=FAILED, error=str(e), lease_expires_at=None):
+                logging.error(f"Job {job_id} lost its lease; failure not recorded")
+                return
+            self.failed += 1
+        else:
+            if not await self.store.update(
+                job_id, attempt=attempt, status=SUCCEEDED, result=result, error=None, lease_expires_at=None
+            ):
+                logging.error(f"Job {job_id} lost its lease; result discarded")
+                return
+            self.succeeded += 1
+        finally:
+            renewer.cancel()
+        self._schedule_notify(job_id)
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self.store.claim(self.lease_seconds, self.max_attempts)
+            except Exception as e:
+                logging.warning(f"Job claim failed: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:
+                # The job's lease lapses and another claim picks it up; this worker carries on.
+                logging.error(f"Job {job['_id']} could not be recorded: {e}")
+
+    def start(self):
+        if not self._tasks:
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        tasks = self._tasks + list(self._callbacks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self):
+        return {
+            "workers": sum(not task.done() for task in self._tasks),
+            "callbacks_pending": len(self._callbacks),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
@@ -0,0 +1,87 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
+# Keeps technology tokens such as "c++", "c#", "node.js" and "ci/cd" intact.
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each etc few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just least less like may me might more most must my myself no nor not now of off on once only or
+other our ours ourselves out over own per same shall she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up upon us
+very via was we were what when where which while who whom why will with within without would you
+your yours yourself yourselves
+ability able across candidate candidates company etc excellent experience good including
+looking plus preferred required requirements responsibilities role strong team work working years
+""".split())
+
+MIN_KEYWORD_LENGTH = 3
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _is_keyword(token):
+    return len(token) >= MIN_KEYWORD_LENGTH and token not in STOPWORDS and not token.isdigit()
+
+
+def extract_keywords(text, top_n=15, max_ngram=2, min_ngram_count=2):
+    """Rank the most frequent non-stopword terms in ``text``.
+
+    Multi-word phrases (up to ``max_ngram`` tokens, every token a keyword)
+    are included when they occur at least ``min_ngram_count`` times.
+    """
+    tokens = tokenize(text)
+    counts = Counter(token for token in tokens if _is_keyword(token))
+    for n in range(2, max_ngram + 1):
+        grams = Counter(
+            gram for gram in zip(*(tokens[i:] for i in range(n)))
+            if all(_is_keyword(token) for token in gram)
+        )
+        counts.update({" ".join(gram): c for gram, c in grams.items() if c >= min_ngram_count})
+    return [keyword for keyword, _ in counts.most_common(top_n)]
+
+
+class KeywordMatcher:
+    """A compiled keyword set matched against text in one tokenising pass.
+
+    Keywords are indexed by token length; matching builds the n-gram set of
+    the text once per distinct length and intersects, so the cost is linear
+    in the text regardless of how many keywords there are.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        self._by_length = {}
+        self._phrases = {}
+        for keyword in self.keywords:
+            gram = tuple(tokenize(keyword))
+            if not gram:
+                continue
+            self._by_length.setdefault(len(gram), set()).add(gram)
+            self._phrases.setdefault(gram, []).append(keyword)
+
+    def match_tokens(self, tokens):
+        found = set()
+        for n, grams in self._by_length.items():
+            present = grams.intersection(zip(*(tokens[i:] for i in range(n))))
+            for gram in present:
+                found.update(self._phrases[gram])
+        return found
+
+    def match(self, text):
+        return self.match_tokens(tokenize(text))
+
+    def coverage(self, text):
+        if not self.keywords:
+            return 0.0
+        return len(self.match(text)) / len(self.keywords)
+
+
+@lru_cache(maxsize=256)
+def compile_keywords(keywords):
+    return KeywordMatcher(keywords)
@@ -0,0 +1,33 @@
+import hashlib
+import json
+import os
+
+from dotenv import load_dotenv
+
+from cache import TieredCache
+
+load_dotenv()
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 2048))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "false").lower() == "true"
+
+
+def cache_key(**parts) -> str:
+    """Deterministic key over every input that affects the completion."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=list)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(TieredCache):
+    """Completion cache; a failing persistent tier never fails a rewrite."""
+
+    def __init__(self, maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL_SECONDS, collection=None):
+        super().__init__(maxsize=maxsize, ttl=ttl, collection=collection)
+
+
+def create_response_cache() -> ResponseCache:
+    if LLM_CACHE_PERSIST:
+        from database import db
+        return ResponseCache(collection=db["llm_cache"])
+    return ResponseCache()
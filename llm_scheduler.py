@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_MODEL_CONCURRENCY = int(os.getenv("LLM_MODEL_CONCURRENCY", 4))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 30))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 0.5))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 20))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", 90))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_DURATION_PART = re.compile(r"([\d.]+)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when a call could not complete within its retries or deadline."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_duration(value):
+    # Groq sends both plain seconds ("7") and Go-style durations ("1m2.5s").
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = _DURATION_PART.findall(value)
+        return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts) if parts else None
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    return _parse_duration(headers.get("retry-after")) or _parse_duration(
+        headers.get("x-ratelimit-reset-requests")
+    )
+
+
+def _is_retryable(error):
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+class TokenBucket:
+    """Request-rate limiter with additive-increase / multiplicative-decrease.
+
+    Each rate-limit error halves the refill rate and may pause the bucket for
+    the server's retry-after; each success nudges the rate back up.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.max_rate = requests_per_minute / 60
+        self.min_rate = self.max_rate / 16
+        self.rate = self.max_rate
+        self.capacity = max(1.0, requests_per_minute / 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def on_rate_limited(self, retry_after=None):
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+class LLMScheduler:
+    """Shared gate for every chain call: concurrency limits, rate limiting, retries and deadlines."""
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, model_concurrency=LLM_MODEL_CONCURRENCY,
+                 requests_per_minute=LLM_REQUESTS_PER_MINUTE, max_retries=LLM_MAX_RETRIES,
+                 deadline=LLM_DEADLINE_SECONDS):
+        self.global_semaphore = asyncio.Semaphore(max_concurrency)
+        self.model_concurrency = model_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self._model_semaphores = {}
+        self._buckets = {}
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    def _semaphore(self, model):
+        if model not in self._model_semaphores:
+            self._model_semaphores[model] = asyncio.Semaphore(self.model_concurrency)
+        return self._model_semaphores[model]
+
+    def _bucket(self, model):
+        if model not in self._buckets:
+            self._buckets[model] = TokenBucket(self.requests_per_minute)
+        return self._buckets[model]
+
+    async def _attempt(self, chain, inputs, model):
+        # Take the rate token before a slot, so a throttled model never parks in slots other models need.
+        await self._bucket(model).acquire()
+        async with self.global_semaphore, self._semaphore(model):
+            return await chain.ainvoke(inputs)
+
+    async def _backoff(self, error, attempt, expires, bucket):
+        """Sleep before the next attempt, or raise if ``error`` is final."""
+        loop = asyncio.get_running_loop()
+        retry_after = _retry_after(error)
+        if _status_code(error) == 429:
+            self.rate_limited += 1
+            bucket.on_rate_limited(retry_after)
+        if not _is_retryable(error) or attempt >= self.max_retries:
+            self.failures += 1
+            raise LLMUnavailableError(f"call failed: {error}", retry_after=retry_after) from error
+        delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+        delay = max(delay, retry_after or 0)
+        logging.warning(f"LLM call failed ({error}); retry {attempt + 1} in {delay:.1f}s")
+        self.retries += 1
+        await asyncio.sleep(min(delay, max(0, expires - loop.time())))
+
+    def _check_deadline(self, expires, model):
+        if asyncio.get_running_loop().time() >= expires:
+            self.failures += 1
+            raise LLMUnavailableError(f"{model} call missed its deadline")
+
+    async def _within(self, coro, expires, model):
+        """Await ``coro`` until ``expires``.
+
+        Unlike ``wait_for`` this tells our deadline apart from a ``TimeoutError``
+        raised by the client itself, which ``_backoff`` should see and retry.
+        """
+        task = asyncio.ensure_future(coro)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=max(0, expires - asyncio.get_running_loop().time()))
+        finally:
+            if not task.done():
+                task.cancel()
+        if not done:
+            self.failures += 1
+            raise LLMUnavailableError(f"{model} call missed its deadline")
+        return task.result()
+
+    async def invoke(self, chain, inputs, model, deadline=None):
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + (deadline or self.deadline)
+        bucket = self._bucket(model)
+        attempt = 0
+        while True:
+            self._check_deadline(expires, model)
+            try:
+                self.calls += 1
+                result = await self._within(self._attempt(chain, inputs, model), expires, model)
+                bucket.on_success()
+                return result
+            except LLMUnavailableError:
+                raise
+            except Exception as e:
+                await self._backoff(e, attempt, expires, bucket)
+                attempt += 1
+
+    async def _drain(self, chain, inputs, model, bucket, queue):
+        await bucket.acquire()
+        async with self.global_semaphore, self._semaphore(model):
+            async for chunk in chain.astream(inputs):
+                queue.put_nowait(("chunk", chunk))
+
+    async def _produce(self, chain, inputs, model, bucket, expires, queue):
+        # One deadline bounds the token wait, the slots and every chunk.
+        try:
+            await self._within(self._drain(chain, inputs, model, bucket, queue), expires, model)
+            queue.put_nowait(("done", None))
+        except Exception as e:
+            queue.put_nowait(("error", e))
+
+    async def stream(self, chain, inputs, model, deadline=None):
+        """Yield ``chain.astream`` chunks; retries only happen before the first chunk.
+
+        A producer task reads the upstream stream into a queue while holding
+        the concurrency slots, so a slow consumer never holds them.
+        """
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + (deadline or self.deadline)
+        bucket = self._bucket(model)
+        attempt = 0
+        while True:
+            self._check_deadline(expires, model)
+            self.calls += 1
+            queue = asyncio.Queue()
+            producer = asyncio.ensure_future(self._produce(chain, inputs, model, bucket, expires, queue))
+            started = False
+            try:
+                while True:
+                    kind, value = await queue.get()
+                    if kind == "done":
+                        bucket.on_success()
+                        return
+                    if kind == "error":
+                        raise value
+                    started = True
+                    yield value
+            except LLMUnavailableError:
+                raise
+            except Exception as e:
+                if started:
+                    self.failures += 1
+                    raise LLMUnavailableError(f"{model} stream interrupted: {e}") from e
+                await self._backoff(e, attempt, expires, bucket)
+                attempt += 1
+            finally:
+                # Also reached when the consumer stops early; don't leave the upstream call running.
+                producer.cancel()
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "rates_per_minute": {model: round(b.rate * 60, 2) for model, b in self._buckets.items()},
+        }
+
+
+scheduler = LLMScheduler()
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr
+from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field
 
 class SignupModel(BaseModel):
     email: EmailStr
@@ -11,3 +12,10 @@ class LoginModel(BaseModel):
 
 class RequestOTPModel(BaseModel):
     email: EmailStr
+
+class BatchATSScoreModel(BaseModel):
+    job_descriptions: List[str]
+    document_ids: List[str] = []
+    resumes: List[str] = []
+    top_k: Optional[int] = Field(None, ge=1)
+    stream: bool = False
@@ -0,0 +1,133 @@
+import asyncio
+import hmac
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+
+from cache import LRUCache
+
+load_dotenv()
+
+OTP_STORE_BACKEND = os.getenv("OTP_STORE_BACKEND", "memory")
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", 10 * 60))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
+OTP_CACHE_SIZE = int(os.getenv("OTP_CACHE_SIZE", 10000))
+OTP_SWEEP_INTERVAL_SECONDS = float(os.getenv("OTP_SWEEP_INTERVAL_SECONDS", 60))
+
+
+def _is_code(otp) -> bool:
+    # str.isdigit alone accepts non-ASCII digits, which compare_digest rejects.
+    return isinstance(otp, str) and otp.isascii() and otp.isdigit()
+
+
+class OTPStore(ABC):
+    """Expiring one-time codes keyed by email.
+
+    A code is consumed by the first successful ``verify`` and invalidated
+    after ``max_attempts`` wrong guesses. Anything but ASCII digits never verifies.
+    """
+
+    @abstractmethod
+    async def put(self, email: str, otp: str):
+        ...
+
+    @abstractmethod
+    async def verify(self, email: str, otp: str) -> bool:
+        ...
+
+    async def ensure_indexes(self):
+        pass
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class InMemoryOTPStore(OTPStore):
+    """Per-process store; only correct with a single uvicorn worker."""
+
+    def __init__(self, maxsize=OTP_CACHE_SIZE, ttl=OTP_TTL_SECONDS, max_attempts=OTP_MAX_ATTEMPTS,
+                 sweep_interval=OTP_SWEEP_INTERVAL_SECONDS):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self._sweeper = None
+
+    async def put(self, email: str, otp: str):
+        self._cache.set(email, {"otp": otp, "attempts": 0})
+
+    async def verify(self, email: str, otp: str) -> bool:
+        # No awaits below, so the read-modify-write cannot interleave with another request.
+        entry = self._cache.get(email)
+        if entry is None:
+            return False
+        if _is_code(otp) and hmac.compare_digest(entry["otp"].encode(), otp.encode()):
+            self._cache.pop(email)
+            return True
+        entry["attempts"] += 1
+        if entry["attempts"] >= self.max_attempts:
+            self._cache.pop(email)
+        return False
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            swept = self._cache.sweep()
+            if swept:
+                logging.debug(f"Swept {swept} expired OTPs")
+
+    def start(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.ensure_future(self._sweep())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+
+class MongoOTPStore(OTPStore):
+    """Shared store backed by a Mongo collection with a TTL index."""
+
+    def __init__(self, collection, ttl=OTP_TTL_SECONDS, max_attempts=OTP_MAX_ATTEMPTS):
+        self.collection = collection
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def put(self, email: str, otp: str):
+        await self.collection.replace_one(
+            {"_id": email},
+            {"otp": otp, "attempts": 0, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)},
+            upsert=True,
+        )
+
+    async def verify(self, email: str, otp: str) -> bool:
+        # The TTL monitor only runs once a minute, so check expiry here too.
+        live = {"_id": email, "expires_at": {"$gt": datetime.utcnow()}, "attempts": {"$lt": self.max_attempts}}
+        # Deleting on match makes consumption atomic across workers.
+        if _is_code(otp) and await self.collection.find_one_and_delete({**live, "otp": otp}) is not None:
+            return True
+        entry = await self.collection.find_one_and_update(
+            {"_id": email}, {"$inc": {"attempts": 1}}, return_document=ReturnDocument.AFTER
+        )
+        if entry is not None and entry["attempts"] >= self.max_attempts:
+            await self.collection.delete_one({"_id": email})
+        return False
+
+
+def create_otp_store(backend: str = OTP_STORE_BACKEND) -> OTPStore:
+    if backend == "memory":
+        return InMemoryOTPStore()
+    if backend == "mongo":
+        from database import db
+        return MongoOTPStore(db["otps"])
+    raise ValueError(f"Unknown OTP_STORE_BACKEND: {backend}")
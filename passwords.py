@@ -0,0 +1,77 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+
+# Pinning min and max to the configured cost makes verify_and_update return
+# a fresh hash for any stored hash made at a different cost.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a few threads hash in parallel without
+# starving the event loop or the default executor.
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_metrics_lock = threading.Lock()
+_metrics = {}
+rehashed = 0
+
+
+def _timed(operation, fn, *args):
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        elapsed = time.perf_counter() - started
+        with _metrics_lock:
+            entry = _metrics.setdefault(operation, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            entry["count"] += 1
+            entry["total_seconds"] += elapsed
+            entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+
+async def _run(operation, fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, _timed, operation, fn, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run("hash", pwd_context.hash, password)
+
+
+async def verify_and_update(password: str, hashed: str):
+    """Return ``(valid, new_hash)``; ``new_hash`` is set when the stored cost is outdated."""
+    global rehashed
+    valid, new_hash = await _run("verify", pwd_context.verify_and_update, password, hashed)
+    if new_hash:
+        rehashed += 1
+    return valid, new_hash
+
+
+def stats():
+    with _metrics_lock:
+        operations = {
+            operation: {
+                "count": entry["count"],
+                "mean_ms": round(entry["total_seconds"] / entry["count"] * 1000, 2),
+                "max_ms": round(entry["max_seconds"] * 1000, 2),
+            }
+            for operation, entry in _metrics.items()
+        }
+    return {"rounds": BCRYPT_ROUNDS, "workers": PASSWORD_HASH_WORKERS, "rehashed": rehashed, **operations}
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,185 @@
+import asyncio
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import fitz  # PyMuPDF
+from dotenv import load_dotenv
+
+from resume_parser import KIND_CONTENT, KIND_PERSONAL, PERSONAL_HEADER, ParsedResume, Section, header_kind
+
+load_dotenv()
+
+PDF_EXECUTOR = os.getenv("PDF_EXECUTOR", "thread")  # "thread" or "process"
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", 4))
+PDF_MAX_CONCURRENCY = int(os.getenv("PDF_MAX_CONCURRENCY", PDF_WORKERS))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 40))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", 10 * 1024 * 1024))
+PDF_STREAM_CHUNK_PAGES = int(os.getenv("PDF_STREAM_CHUNK_PAGES", 2))
+PDF_EXTRACTION_MODE = os.getenv("PDF_EXTRACTION_MODE", "text")  # "text" or "layout"
+
+EXTRACTION_MODES = ("text", "layout")
+HEADER_SIZE_RATIO = 1.15
+HEADER_MAX_CHARS = 40
+HEADER_MAX_WORDS = 5
+BOLD_FLAG = 16
+
+_executor = None
+_semaphore = asyncio.Semaphore(PDF_MAX_CONCURRENCY)
+
+
+class PDFExtractionError(ValueError):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _open(contents):
+    try:
+        return fitz.open(stream=contents, filetype="pdf")
+    except Exception as e:
+        raise PDFExtractionError(f"Could not read PDF: {e}")
+
+
+def _check_page_count(page_count):
+    if page_count > PDF_MAX_PAGES:
+        raise PDFExtractionError(f"PDF has {page_count} pages; the limit is {PDF_MAX_PAGES}.", status_code=413)
+
+
+def _page_count(contents):
+    with _open(contents) as pdf:
+        return pdf.page_count
+
+
+def _extract_pages(contents, start=0, stop=None):
+    with _open(contents) as pdf:
+        _check_page_count(pdf.page_count)
+        stop = pdf.page_count if stop is None else min(stop, pdf.page_count)
+        return [pdf[i].get_text() for i in range(start, stop)]
+
+
+def _page_lines(page):
+    """Return ``(text, size, bold)`` per visual line, in column-major reading order."""
+    blocks = [b for b in page.get_text("dict")["blocks"] if b.get("type") == 0]
+    middle = page.rect.width / 2
+    # Blocks starting right of the page middle belong to the second column.
+    blocks.sort(key=lambda b: (b["bbox"][0] >= middle, round(b["bbox"][1]), b["bbox"][0]))
+    lines = []
+    for block in blocks:
+        for line in block["lines"]:
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+            text = " ".join(span["text"].strip() for span in spans)
+            size = max(span["size"] for span in spans)
+            bold = all(span["flags"] & BOLD_FLAG or "bold" in span["font"].lower() for span in spans)
+            lines.append((text, size, bold))
+    return lines
+
+
+def _is_layout_header(text, size, bold, body_size):
+    if len(text) > HEADER_MAX_CHARS or len(text.split()) > HEADER_MAX_WORDS:
+        return False
+    if text.endswith((".", ",", ";")) or text[0] in "-•*":
+        return False
+    # Bold alone also marks job titles and employers, so it only counts for all-caps lines.
+    return (
+        size >= body_size * HEADER_SIZE_RATIO
+        or header_kind(text) != KIND_CONTENT
+        or (bold and text.isupper())
+    )
+
+
+def _extract_layout(contents):
+    with _open(contents) as pdf:
+        _check_page_count(pdf.page_count)
+        lines = [line for page in pdf for line in _page_lines(page)]
+    if not lines:
+        return "", ParsedResume()
+
+    sizes = Counter()
+    for text, size, _ in lines:
+        sizes[round(size, 1)] += len(text)
+    body_size = sizes.most_common(1)[0][0]
+
+    # [header, kind, body lines, start, end]; the first line (the name) is never a header.
+    sections = [[PERSONAL_HEADER, KIND_PERSONAL, [lines[0][0]], 0, len(lines[0][0])]]
+    position = len(lines[0][0]) + 1
+    seen = {PERSONAL_HEADER}
+    for text, size, bold in lines[1:]:
+        # A repeated header stays in the body, so no section is shadowed and text keeps its order.
+        if text not in seen and _is_layout_header(text, size, bold, body_size):
+            seen.add(text)
+            sections.append([text, header_kind(text), [], position, position + len(text)])
+        else:
+            sections[-1][2].append(text)
+            sections[-1][4] = position + len(text)
+        position += len(text) + 1
+
+    text = "\n".join(line[0] for line in lines)
+    parsed = ParsedResume([
+        Section(header, "\n".join(body).strip(), kind, start, end)
+        for header, kind, body, start, end in sections
+    ])
+    return text, parsed
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        if PDF_EXECUTOR == "process":
+            # Not fork: the API process already runs threads that a forked child could deadlock on.
+            _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+        else:
+            _executor = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf-extract")
+    return _executor
+
+
+async def _run(fn, *args):
+    loop = asyncio.get_running_loop()
+    async with _semaphore:
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+
+
+def check_size(contents):
+    if len(contents) > PDF_MAX_BYTES:
+        raise PDFExtractionError(f"PDF is larger than {PDF_MAX_BYTES} bytes.", status_code=413)
+
+
+async def extract_text(contents: bytes) -> str:
+    check_size(contents)
+    pages = await _run(_extract_pages, contents)
+    return "\n".join(pages)
+
+
+async def extract_layout(contents: bytes):
+    """Return ``(text, ParsedResume)`` using font size, weight and position.
+
+    Headers come from the PDF's typography rather than capitalisation
+    heuristics, and two-column layouts are read column by column.
+    """
+    check_size(contents)
+    return await _run(_extract_layout, contents)
+
+
+async def iter_pages(contents: bytes, chunk_pages: int = PDF_STREAM_CHUNK_PAGES):
+    """Yield ``(page_number, text)`` pairs, extracting ``chunk_pages`` at a time.
+
+    Each chunk is a separate pool task, so a long document never holds a
+    worker slot for its whole duration.
+    """
+    check_size(contents)
+    page_count = await _run(_page_count, contents)
+    _check_page_count(page_count)
+    for start in range(0, page_count, chunk_pages):
+        texts = await _run(_extract_pages, contents, start, start + chunk_pages)
+        for offset, text in enumerate(texts):
+            yield start + offset, text
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
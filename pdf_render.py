@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from types import MappingProxyType
+from xml.sax.saxutils import escape
+
+from dotenv import load_dotenv
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+from cache import LRUCache
+from resume_parser import ParsedResume, parse_document, split_bullet
+
+load_dotenv()
+
+# Extra directories to search for TrueType fonts, separated by os.pathsep.
+PDF_FONT_DIRS = [d for d in os.getenv("PDF_FONT_DIRS", "").split(os.pathsep) if d]
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", 2))
+PDF_RENDER_QUEUE_DEPTH = int(os.getenv("PDF_RENDER_QUEUE_DEPTH", 16))
+PDF_RENDER_TIMEOUT_SECONDS = float(os.getenv("PDF_RENDER_TIMEOUT_SECONDS", 30))
+PDF_RENDER_CACHE_SIZE = int(os.getenv("PDF_RENDER_CACHE_SIZE", 256))
+PDF_RENDER_CACHE_MAX_BYTES = int(os.getenv("PDF_RENDER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Bump when the layout changes so cached PDFs and client ETags are invalidated.
+TEMPLATE = "ats-v3"
+
+# (family, regular file, bold file) in order of preference. Vera ships with
+# reportlab, so it is always available before falling back to Helvetica.
+FONT_CANDIDATES = [
+    ("Arial", ("Arial.ttf", "arial.ttf"), ("Arial Bold.ttf", "arialbd.ttf")),
+    ("Vera", ("Vera.ttf",), ("VeraBd.ttf",)),
+]
+FALLBACK_FONTS = ("Helvetica", "Helvetica-Bold")
+
+
+_fonts = None
+_styles = None
+_init_lock = threading.Lock()
+
+_pool = None
+_pending = 0
+_pending_lock = threading.Lock()
+_in_flight = {}
+_rendered = LRUCache(maxsize=PDF_RENDER_CACHE_SIZE, max_bytes=PDF_RENDER_CACHE_MAX_BYTES, sizeof=len)
+
+
+class RenderQueueFull(RuntimeError):
+    pass
+
+
+def _register(name, filenames):
+    for filename in filenames:
+        for path in [os.path.join(d, filename) for d in PDF_FONT_DIRS] + [filename]:
+            try:
+                pdfmetrics.registerFont(TTFont(name, path))
+                return True
+            except Exception:
+                continue
+    return False
+
+
+def _resolve_fonts():
+    for family, regular, bold in FONT_CANDIDATES:
+        if _register(family, regular) and _register(f"{family}-Bold", bold):
+            return family, f"{family}-Bold"
+    logging.warning("No TrueType font found - falling back to Helvetica.")
+    return FALLBACK_FONTS
+
+
+def _build_styles(base_font, bold_font):
+    return MappingProxyType({
+        'title': ParagraphStyle(
+            name='Title',
+            fontName=bold_font,
+            fontSize=14,
+            leading=16,
+            spaceAfter=12,
+            alignment=1
+        ),
+        'section': ParagraphStyle(
+            name='Section',
+            fontName=bold_font,
+            fontSize=12,
+            leading=14,
+            spaceAfter=8,
+            textTransform='uppercase',
+            alignment=1
+        ),
+        'bullet': ParagraphStyle(
+            name='Bullet',
+            fontName=base_font,
+            fontSize=11,
+            leading=13,
+            leftIndent=10,
+            bulletIndent=5,
+            spaceBefore=4,
+            spaceAfter=4,
+            alignment=1
+        ),
+        'normal': ParagraphStyle(
+            name='Normal',
+            fontName=base_font,
+            fontSize=11,
+            leading=13,
+            spaceAfter=6,
+            alignment=1
+        ),
+        'footer': ParagraphStyle(
+            name='Footer',
+            fontName=base_font,
+            fontSize=8,
+            leading=10,
+            alignment=1,
+            textColor=colors.grey
+        ),
+    })
+
+
+def init():
+    """Resolve and register fonts and build the shared styles; safe to call repeatedly."""
+    global _fonts, _styles
+    if _styles is None:
+        with _init_lock:
+            if _styles is None:
+                _fonts = _resolve_fonts()
+                logging.info(f"PDF rendering with {_fonts[0]}")
+                _styles = _build_styles(*_fonts)
+    return _styles
+
+
+def _add_footer(canvas, doc):
+    canvas.saveState()
+    canvas.setFont('Helvetica', 8)
+    canvas.drawString(270, 30, f"Page {doc.page}")
+    canvas.restoreState()
+
+
+def render_sections(parsed: ParsedResume) -> bytes:
+    """Lay out a parsed resume as an ATS-friendly PDF and return its bytes."""
+    styles = init()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        leftMargin=36,
+        rightMargin=36,
+        topMargin=72,
+        bottomMargin=36
+    )
+
+    story = []
+    for section in parsed.sections:
+        if section.titled:
+            story.append(Paragraph(f"<b>{escape(section.header.upper())}</b>", styles['section']))
+        for line in section.lines():
+            is_bullet, text = split_bullet(line)
+            if is_bullet:
+                story.append(Paragraph(f"• {escape(text)}", styles['bullet']))
+            else:
+                story.append(Paragraph(escape(text), styles['normal']))
+            story.append(Spacer(1, 4))
+
+    doc.build(story, onFirstPage=_add_footer, onLaterPages=_add_footer)
+    return buffer.getvalue()
+
+
+def render(resume_text: str) -> bytes:
+    return render_sections(parse_document(resume_text))
+
+
+def render_key(resume_text: str, template: str = TEMPLATE) -> str:
+    """Content hash identifying a rendered PDF; also used as its ETag."""
+    return hashlib.sha256(f"{template}\0{resume_text}".encode("utf-8")).hexdigest()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Forking a process that already runs threads (embedding service, bcrypt
+        # pool, torch) can deadlock the child on a lock held mid-fork; forkserver
+        # workers start from a clean single-threaded server instead.
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_RENDER_WORKERS, initializer=init, mp_context=multiprocessing.get_context("forkserver")
+        )
+    return _pool
+
+
+def _release_slot(_):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _render_in_pool(key, parsed):
+    global _pending
+    with _pending_lock:
+        if _pending >= PDF_RENDER_QUEUE_DEPTH:
+            raise RenderQueueFull(f"{_pending} renders already queued")
+        _pending += 1
+    # The slot is freed when the pool finishes the render, not when the caller
+    # stops waiting, so a timed-out render still counts against the queue depth.
+    future = _get_pool().submit(render_sections, parsed)
+    future.add_done_callback(_release_slot)
+    pdf = await asyncio.wait_for(asyncio.wrap_future(future), PDF_RENDER_TIMEOUT_SECONDS)
+    _rendered.set(key, pdf)
+    return pdf
+
+
+async def render_async(resume_text: str, parsed: ParsedResume = None) -> bytes:
+    """Render in the process pool, serving repeats from the rendered-output cache.
+
+    ``parsed`` is the resume's structured form when the caller already has
+    it. Concurrent requests for the same PDF share one render. Raises
+    ``RenderQueueFull`` when ``PDF_RENDER_QUEUE_DEPTH`` renders are pending
+    and ``asyncio.TimeoutError`` after ``PDF_RENDER_TIMEOUT_SECONDS``.
+    """
+    key = render_key(resume_text)
+    pdf = _rendered.get(key)
+    if pdf is not None:
+        return pdf
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_render_in_pool(key, parsed or parse_document(resume_text)))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+if __name__ == "__main__":
+    import timeit
+
+    sample = "\n".join(
+        ["Jane Doe", "jane@example.com | linkedin.com/in/janedoe", "WORK EXPERIENCE"]
+        + [f"- Delivered project {i}, cutting latency by {i}% for 1,000+ users." for i in range(60)]
+        + ["EDUCATION", "B.Tech Computer Science, Example University, 2018"]
+    )
+    init()
+    runs = 20
+    seconds = timeit.timeit(lambda: render(sample), number=runs)
+    print(f"{len(render(sample))} bytes: {seconds / runs * 1000:.1f} ms per render")
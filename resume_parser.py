@@ -0,0 +1,219 @@
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+EDUCATION_ALIASES = {
+    "education", "academic background", "academic qualifications",
+    "academic history", "educational qualifications", "qualifications",
+    "academics", "educational background"
+}
+PERSONAL_ALIASES = {
+    "personal information", "personal details", "contact information",
+    "contact details", "profile", "about me"
+}
+# Titles that head a section whatever their case, for the lossless document split.
+SECTION_TITLES = EDUCATION_ALIASES | PERSONAL_ALIASES | {
+    "summary", "professional summary", "objective", "career objective",
+    "experience", "work experience", "professional experience", "employment history",
+    "skills", "technical skills", "core competencies", "projects", "certifications",
+    "achievements", "awards", "publications", "languages", "interests", "volunteering"
+}
+
+def _alternation(aliases):
+    return "|".join(re.escape(alias) for alias in sorted(aliases, key=len, reverse=True))
+
+# One pass decides "is this line an education/personal header" for every alias.
+HEADER_ALIAS_PATTERN = re.compile(
+    rf"^\s*(?:(?P<education>{_alternation(EDUCATION_ALIASES)})|(?P<personal>{_alternation(PERSONAL_ALIASES)}))",
+    re.IGNORECASE,
+)
+TITLE_PATTERN = re.compile(r"^[A-Z][A-Za-z\s]+$")
+UPPERCASE_HEADING_PATTERN = re.compile(r"^[A-Z][A-Z&/ ]{2,}[A-Z]:?$")
+COLLEGE_PATTERN = re.compile(r"\b(college|institute|university|academy|school of)\b", re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+PHONE_PATTERN = re.compile(r"\+?[0-9]{1,4}?[-.\s]?\(?\d{1,3}?\)?[-.\s]?\d{1,3}[-.\s]?\d{1,4}")
+SOCIAL_LINKS_PATTERN = re.compile(r"(linkedin|github)\.(com|in)\/([A-Za-z0-9-]+)", re.IGNORECASE)
+
+BULLET_PREFIXES = ("- ", "• ", "* ")
+
+PERSONAL_HEADER = "Personal Details"
+EDUCATION_HEADER = "Education"
+PERSONAL_SCAN_LINES = 10
+
+KIND_PERSONAL = "personal"
+KIND_EDUCATION = "education"
+KIND_CONTENT = "content"
+
+
+@dataclass(frozen=True)
+class Section:
+    header: str
+    body: str
+    kind: str = KIND_CONTENT
+    # Character offsets into the source text; None for synthesized sections.
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+    @property
+    def rewritable(self):
+        return self.kind == KIND_CONTENT
+
+    @property
+    def titled(self):
+        # The synthesized personal block is the resume's heading, not a titled section.
+        return self.header != PERSONAL_HEADER
+
+    def lines(self):
+        return [line.strip() for line in self.body.split("\n") if line.strip()]
+
+
+@dataclass
+class ParsedResume:
+    sections: List[Section] = field(default_factory=list)
+
+    @property
+    def headers(self):
+        return [section.header for section in self.sections]
+
+    def get(self, header) -> Optional[Section]:
+        return next((s for s in self.sections if s.header == header), None)
+
+    def rewritable(self) -> Dict[str, str]:
+        return {s.header: s.body for s in self.sections if s.rewritable}
+
+    def excluded(self) -> Dict[str, str]:
+        return {s.header: s.body for s in self.sections if not s.rewritable}
+
+    def text(self) -> str:
+        return "\n\n".join(f"{s.header}\n{s.body}" for s in self.sections)
+
+    def to_dict(self):
+        return {"sections": [asdict(s) for s in self.sections]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([Section(**section) for section in data.get("sections", [])])
+
+
+def split_bullet(line):
+    """Return ``(is_bullet, text)`` for one stripped body line."""
+    if line.startswith(BULLET_PREFIXES):
+        return True, line[2:].strip()
+    return False, line
+
+
+def header_kind(line) -> str:
+    match = HEADER_ALIAS_PATTERN.match(line)
+    if match is None:
+        return KIND_CONTENT
+    return KIND_EDUCATION if match.group("education") else KIND_PERSONAL
+
+
+def _is_personal_line(line):
+    return bool(
+        EMAIL_PATTERN.search(line)
+        or PHONE_PATTERN.search(line)
+        or SOCIAL_LINKS_PATTERN.search(line)
+        or TITLE_PATTERN.match(line.strip())
+    )
+
+
+def parse_resume(resume_text: str) -> ParsedResume:
+    """Split plain resume text into sections in a single pass over its lines."""
+    lines = resume_text.splitlines(keepends=True)
+    offsets = []
+    position = 0
+    for line in lines:
+        offsets.append(position)
+        position += len(line)
+    lines = [line.rstrip("\r\n") for line in lines]
+
+    # header -> [kind, body lines, start, end]; dict keeps first-seen order.
+    sections = {}
+
+    index = 0
+    while index < min(PERSONAL_SCAN_LINES, len(lines)) and _is_personal_line(lines[index]):
+        index += 1
+    if index:
+        end = offsets[index - 1] + len(lines[index - 1])
+        sections[PERSONAL_HEADER] = [KIND_PERSONAL, lines[:index], 0, end]
+
+    current = None
+    for i in range(index, len(lines)):
+        line = lines[i]
+        clean = line.strip()
+        if not clean:
+            continue
+        kind = header_kind(clean)
+        if kind != KIND_CONTENT or TITLE_PATTERN.match(clean):
+            current = clean
+            # A repeated header restarts its section, as the original splitter did.
+            sections[current] = [kind, [], offsets[i], offsets[i] + len(line)]
+        elif current is not None:
+            entry = sections[current]
+            entry[1].append(line)
+            entry[3] = offsets[i] + len(line)
+
+    if not any(clean.lower() in EDUCATION_ALIASES for clean in sections):
+        edu_lines = [line for line in lines if COLLEGE_PATTERN.search(line)]
+        if edu_lines:
+            sections[EDUCATION_HEADER] = [KIND_EDUCATION, edu_lines, None, None]
+
+    return ParsedResume([
+        Section(header, "\n".join(body).strip(), kind, start, end)
+        for header, (kind, body, start, end) in sections.items()
+    ])
+
+
+def _is_document_heading(line):
+    if len(line) > 50 or line.startswith(BULLET_PREFIXES):
+        return False
+    return line.rstrip(":").strip().lower() in SECTION_TITLES or bool(UPPERCASE_HEADING_PATTERN.match(line))
+
+
+def parse_document(resume_text: str) -> ParsedResume:
+    """Split resume text for rendering without dropping or moving any line.
+
+    Unlike ``parse_resume`` this keeps repeated headers as separate sections,
+    only treats known titles or all-caps lines as headers, and synthesizes
+    nothing: lines before the first header form an untitled leading section.
+    """
+    lines = [line.strip() for line in resume_text.splitlines() if line.strip()]
+    # Rewrites made before section-scoped feedback carry the synthesized label.
+    if lines and lines[0] == PERSONAL_HEADER:
+        lines = lines[1:]
+
+    sections = []
+    header, kind, body = PERSONAL_HEADER, KIND_PERSONAL, []
+    for line in lines:
+        if _is_document_heading(line):
+            if header != PERSONAL_HEADER or body:
+                sections.append(Section(header, "\n".join(body), kind))
+            name = line.rstrip(":").strip()
+            header, kind, body = name, header_kind(name), []
+        else:
+            body.append(line)
+    if header != PERSONAL_HEADER or body:
+        sections.append(Section(header, "\n".join(body), kind))
+    return ParsedResume(sections)
+
+
+if __name__ == "__main__":
+    import timeit
+
+    sample = "\n".join([
+        "Jane Doe",
+        "jane@example.com | +1 555 010 0000 | linkedin.com/in/janedoe",
+        "PROFESSIONAL SUMMARY",
+        "Backend engineer with 6 years of Python experience, focused on APIs.",
+        "WORK EXPERIENCE",
+        *[f"- Delivered project {i}, cutting latency by {i}% for 1,000+ users." for i in range(40)],
+        "TECHNICAL SKILLS",
+        "Python, FastAPI, PostgreSQL, Docker, Kubernetes, AWS",
+        "EDUCATION",
+        "B.Tech Computer Science, Example University, 2018",
+    ])
+    runs = 2000
+    seconds = timeit.timeit(lambda: parse_resume(sample), number=runs)
+    print(f"{len(sample)} chars, {len(parse_resume(sample).sections)} sections: "
+          f"{seconds / runs * 1e6:.1f} us per parse")
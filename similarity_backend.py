@@ -0,0 +1,75 @@
+import logging
+import os
+import sys
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "torch" (default), "torch-int8", "onnx" or "onnx-int8".
+# The onnx backends need `pip install sentence-transformers[onnx]`.
+SIMILARITY_BACKEND = os.getenv("SIMILARITY_BACKEND", "torch")
+SIMILARITY_ONNX_INT8_FILE = os.getenv("SIMILARITY_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+SIMILARITY_PARITY_TOLERANCE = float(os.getenv("SIMILARITY_PARITY_TOLERANCE", 1.0))
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+PARITY_SAMPLES = [
+    ("Software engineer with 5 years of Python, Django and AWS experience building REST APIs.",
+     "python django aws rest apis backend engineer"),
+    ("Data scientist skilled in machine learning, TensorFlow, pandas and statistical modelling.",
+     "machine learning tensorflow pandas statistics data"),
+    ("Led a team of 8 nurses across two wards, improving patient satisfaction scores by 20%.",
+     "java spring microservices kubernetes"),
+    ("Frontend developer: React, TypeScript, CSS, accessibility audits and design systems.",
+     "react typescript frontend accessibility"),
+]
+
+
+def load_model(model_name, backend=SIMILARITY_BACKEND):
+    """Build a SentenceTransformer for ``backend``; all expose the same ``encode``."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "torch-int8":
+        import torch
+        model = SentenceTransformer(model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    if backend == "onnx-int8":
+        return SentenceTransformer(
+            model_name, backend="onnx", model_kwargs={"file_name": SIMILARITY_ONNX_INT8_FILE}
+        )
+    raise ValueError(f"Unknown SIMILARITY_BACKEND: {backend} (expected one of {', '.join(BACKENDS)})")
+
+
+def _similarity_scores(model, samples):
+    texts = [text for pair in samples for text in pair]
+    vectors = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    return np.sum(vectors[0::2] * vectors[1::2], axis=1) * 100
+
+
+def check_parity(model_name, backend, samples=PARITY_SAMPLES, tolerance=SIMILARITY_PARITY_TOLERANCE):
+    """Compare ``backend`` similarity scores (0-100 scale) against the torch reference."""
+    reference = _similarity_scores(load_model(model_name, "torch"), samples)
+    candidate = _similarity_scores(load_model(model_name, backend), samples)
+    deltas = np.abs(reference - candidate)
+    return {
+        "backend": backend,
+        "max_delta": round(float(deltas.max()), 4),
+        "mean_delta": round(float(deltas.mean()), 4),
+        "tolerance": tolerance,
+        "ok": bool(deltas.max() <= tolerance),
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from ats_utils import MODEL_NAME
+
+    result = check_parity(MODEL_NAME, sys.argv[1] if len(sys.argv) > 1 else SIMILARITY_BACKEND)
+    print(result)
+    sys.exit(0 if result["ok"] else 1)
@@ -0,0 +1,107 @@
+import asyncio
+
+import cache
+from cache import LRUCache, TieredCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert "b" not in lru
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    lru = LRUCache(ttl=10)
+    lru.set("a", 1)
+    lru.set("b", 2, ttl=60)
+    clock.now += 11
+    assert lru.get("a") is None
+    assert lru.get("b") == 2
+    assert lru.pop("b") == 2
+    assert lru.pop("b") is None
+
+
+def test_pop_of_expired_entry_returns_default(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    lru = LRUCache(ttl=5)
+    lru.set("a", 1)
+    clock.now += 5
+    assert lru.pop("a", "gone") == "gone"
+    assert len(lru) == 0
+
+
+def test_sweep_drops_only_expired(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    lru = LRUCache(ttl=5)
+    lru.set("old", 1)
+    clock.now += 3
+    lru.set("new", 2)
+    clock.now += 3
+    assert lru.sweep() == 1
+    assert len(lru) == 1
+    assert lru.get("new") == 2
+
+
+def test_byte_budget_evicts_and_skips_oversized_values():
+    lru = LRUCache(maxsize=100, max_bytes=10, sizeof=len)
+    lru.set("a", b"12345")
+    lru.set("b", b"12345")
+    lru.set("c", b"123")
+    assert "a" not in lru
+    assert lru.nbytes == 8
+    lru.set("huge", b"x" * 11)
+    assert "huge" not in lru
+    assert lru.nbytes == 8
+
+
+def test_replacing_a_key_keeps_byte_count_exact():
+    lru = LRUCache(max_bytes=100, sizeof=len)
+    lru.set("a", b"1234")
+    lru.set("a", b"12")
+    assert lru.nbytes == 2
+    lru.clear()
+    assert lru.nbytes == 0 and len(lru) == 0
+
+
+def test_evict_where():
+    lru = LRUCache()
+    for key in [("x", 1), ("x", 2), ("y", 1)]:
+        lru.set(key, True)
+    assert lru.evict_where(lambda key: key[0] == "x") == 2
+    assert list(lru._data) == [("y", 1)]
+
+
+class FailingCollection:
+    async def find_one(self, *args, **kwargs):
+        raise RuntimeError("mongo down")
+
+    async def update_one(self, *args, **kwargs):
+        raise RuntimeError("mongo down")
+
+
+def test_tiered_cache_treats_persistent_errors_as_misses():
+    async def run():
+        tiered = TieredCache(collection=FailingCollection())
+        assert await tiered.get("k") is None
+        await tiered.set("k", "v")
+        assert await tiered.get("k") == "v"
+        return tiered.stats()
+
+    assert asyncio.run(run()) == {"hits": 1, "misses": 1, "entries": 1}
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+import cache
+from document_store import DocumentStore, InMemoryDocumentStore
+
+
+def test_documents_are_isolated_from_callers():
+    async def scenario():
+        store = InMemoryDocumentStore()
+        state = {"sections": {}}
+        document_id = await store.create(resume_text="text", rewrite_state=state)
+        state["sections"]["a"] = "caller-side"
+
+        first = await store.get(document_id)
+        second = await store.get(document_id)
+        first["rewrite_state"]["sections"]["b"] = "first request"
+        return second, await store.get(document_id)
+
+    second, stored = asyncio.run(scenario())
+    assert second["rewrite_state"] == {"sections": {}}
+    assert stored["rewrite_state"] == {"sections": {}}
+
+
+def test_update_merges_and_copies_fields():
+    async def scenario():
+        store = InMemoryDocumentStore()
+        document_id = await store.create(resume_text="text")
+        state = {"feedback": {}}
+        assert await store.update(document_id, rewritten_resume="new", rewrite_state=state)
+        state["feedback"]["x"] = "later mutation"
+        return await store.get(document_id), await store.update("missing", rewritten_resume="x")
+
+    document, missing = asyncio.run(scenario())
+    assert document == {"resume_text": "text", "rewritten_resume": "new", "rewrite_state": {"feedback": {}}}
+    assert missing is False
+
+
+def test_documents_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+
+    async def scenario():
+        store = InMemoryDocumentStore(ttl=60)
+        document_id = await store.create(resume_text="text")
+        now[0] += 61
+        return await store.get(document_id), await store.update(document_id, rewritten_resume="x")
+
+    assert asyncio.run(scenario()) == (None, False)
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        DocumentStore()
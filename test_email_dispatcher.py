@@ -0,0 +1,186 @@
+import asyncio
+import socketserver
+import threading
+from email.message import EmailMessage
+
+import pytest
+
+import email_dispatcher
+from email_dispatcher import EmailDispatcher, EmailQueueFull
+
+
+class StandInSMTP:
+    """Minimal local SMTP server whose replies can be scripted per recipient.
+
+    ``rcpt_replies`` and ``data_replies`` map a recipient to reply codes used,
+    one per attempt, at RCPT TO and at the end of DATA; anything unscripted is
+    accepted. With ``drop_after_message`` the server hangs up after each
+    delivery, as a server reaping idle sessions would.
+    """
+
+    def __init__(self, rcpt_replies=None, data_replies=None, drop_after_message=False):
+        self.rcpt_replies = {k: list(v) for k, v in (rcpt_replies or {}).items()}
+        self.data_replies = {k: list(v) for k, v in (data_replies or {}).items()}
+        self.drop_after_message = drop_after_message
+        self.delivered = []
+        self.sessions = 0
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stand_in.sessions += 1
+                self.reply(220, "stand-in ready")
+                recipient, lines, in_data = None, [], False
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    if in_data:
+                        if line != b".\r\n":
+                            lines.append(line)
+                            continue
+                        in_data = False
+                        code = stand_in._next(stand_in.data_replies, recipient)
+                        if code == 250:
+                            stand_in.delivered.append((recipient, b"".join(lines)))
+                        self.reply(code, "data")
+                        lines = []
+                        if code == 250 and stand_in.drop_after_message:
+                            return
+                        continue
+                    command = line[:4].upper()
+                    if command in (b"EHLO", b"HELO"):
+                        self.reply(250, "stand-in")
+                    elif command == b"RCPT":
+                        recipient = line.decode().split("<", 1)[1].split(">", 1)[0]
+                        self.reply(stand_in._next(stand_in.rcpt_replies, recipient), "rcpt")
+                    elif command == b"DATA":
+                        in_data = True
+                        self.reply(354, "go ahead")
+                    elif command == b"QUIT":
+                        self.reply(221, "bye")
+                        return
+                    else:
+                        self.reply(250, "ok")
+
+            def reply(self, code, text):
+                self.wfile.write(f"{code} {text}\r\n".encode())
+
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    @staticmethod
+    def _next(replies, recipient):
+        scripted = replies.get(recipient)
+        return scripted.pop(0) if scripted else 250
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(**script):
+        server = StandInSMTP(**script)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(email_dispatcher, "EMAIL_BACKOFF_BASE", 0.01)
+
+
+def message(to):
+    msg = EmailMessage()
+    msg["From"] = "noreply@example.com"
+    msg["To"] = to
+    msg["Subject"] = "Your code"
+    msg.set_content("123456")
+    return msg
+
+
+def deliver(server, recipients, **options):
+    async def scenario():
+        dispatcher = EmailDispatcher("127.0.0.1", server.port, use_tls=False, **options)
+        dispatcher.start()
+        for to in recipients:
+            dispatcher.enqueue(message(to))
+        await dispatcher.stop(drain=5)
+        return dispatcher.stats()
+
+    return asyncio.run(scenario())
+
+
+def test_one_worker_reuses_one_session(smtp_server):
+    server = smtp_server()
+    stats = deliver(server, [f"user{i}@example.com" for i in range(5)], workers=1)
+    assert stats["sent"] == 5
+    assert stats["connections_opened"] == 1
+    assert server.sessions == 1
+
+
+def test_idle_session_is_replaced(smtp_server):
+    server = smtp_server()
+    stats = deliver(server, ["a@example.com", "b@example.com"], workers=1, idle_seconds=0)
+    assert stats["sent"] == 2
+    assert stats["connections_opened"] == 2
+
+
+def test_dropped_pooled_session_is_reopened_without_counting_a_retry(smtp_server):
+    server = smtp_server(drop_after_message=True)
+    stats = deliver(server, ["a@example.com", "b@example.com", "c@example.com"], workers=1)
+    assert stats["sent"] == 3
+    assert stats["retries"] == 0
+    assert stats["connections_opened"] == 3
+
+
+def test_transient_4xx_is_retried_then_delivered(smtp_server):
+    server = smtp_server(data_replies={"busy@example.com": [451]}, rcpt_replies={"greylisted@example.com": [450]})
+    stats = deliver(server, ["busy@example.com", "greylisted@example.com"], workers=1)
+    assert stats["sent"] == 2
+    assert stats["retries"] == 2
+    assert stats["failed"] == 0
+    assert sorted(recipient for recipient, _ in server.delivered) == ["busy@example.com", "greylisted@example.com"]
+
+
+def test_permanent_5xx_fails_without_retry(smtp_server):
+    server = smtp_server(data_replies={"bad@example.com": [554]}, rcpt_replies={"unknown@example.com": [550]})
+    stats = deliver(server, ["bad@example.com", "unknown@example.com", "ok@example.com"], workers=1)
+    assert stats["failed"] == 2
+    assert stats["retries"] == 0
+    assert stats["sent"] == 1
+    assert [recipient for recipient, _ in server.delivered] == ["ok@example.com"]
+
+
+def test_retries_stop_at_max_retries(smtp_server):
+    server = smtp_server(data_replies={"busy@example.com": [451] * 10})
+    stats = deliver(server, ["busy@example.com"], workers=1, max_retries=2)
+    assert (stats["retries"], stats["failed"], stats["sent"]) == (2, 1, 0)
+
+
+def test_stop_drains_queued_mail(smtp_server):
+    server = smtp_server()
+    stats = deliver(server, [f"user{i}@example.com" for i in range(20)], workers=2)
+    assert stats["sent"] == 20
+    assert stats["queued"] == 0
+    assert len(server.delivered) == 20
+
+
+def test_enqueue_raises_when_the_queue_is_full():
+    async def scenario():
+        dispatcher = EmailDispatcher("127.0.0.1", 1, use_tls=False, queue_size=1)
+        dispatcher.enqueue(message("a@example.com"))
+        with pytest.raises(EmailQueueFull):
+            dispatcher.enqueue(message("b@example.com"))
+
+    asyncio.run(scenario())
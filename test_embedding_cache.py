@@ -0,0 +1,113 @@
+import asyncio
+import multiprocessing
+import threading
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache, MemmapEmbeddingStore, text_hash
+
+
+def vector(seed, dim=8):
+    return np.full(dim, seed, dtype=np.float32)
+
+
+def test_text_hash_is_namespaced():
+    assert text_hash("resume") == text_hash("resume")
+    assert text_hash("resume", "model-a") != text_hash("resume", "model-b")
+
+
+def test_store_round_trips_and_persists(tmp_path):
+    store = MemmapEmbeddingStore(str(tmp_path), initial_capacity=2)
+    for i in range(5):
+        store.put(f"k{i}", vector(i))
+    store.put("k0", vector(99))
+    assert len(store) == 5
+    np.testing.assert_array_equal(store.get("k0"), vector(0))
+    assert store.get("missing") is None
+
+    reopened = MemmapEmbeddingStore(str(tmp_path))
+    assert len(reopened) == 5
+    for i in range(5):
+        np.testing.assert_array_equal(reopened.get(f"k{i}"), vector(i))
+
+
+def test_stores_sharing_a_directory_see_each_others_rows(tmp_path):
+    first = MemmapEmbeddingStore(str(tmp_path), initial_capacity=2)
+    second = MemmapEmbeddingStore(str(tmp_path), initial_capacity=2)
+    first.put("a", vector(1))
+    second.put("b", vector(2))
+    # Forces a grow while first still maps the smaller file.
+    second.put("c", vector(3))
+    first.put("d", vector(4))
+    for store in (first, second):
+        for key, seed in [("a", 1), ("b", 2), ("c", 3), ("d", 4)]:
+            np.testing.assert_array_equal(store.get(key), vector(seed))
+
+
+def test_partial_key_line_from_a_crashed_writer_is_discarded(tmp_path):
+    store = MemmapEmbeddingStore(str(tmp_path))
+    store.put("a", vector(1))
+    with open(tmp_path / "keys.txt", "ab") as f:
+        f.write(b"half-writ")
+    recovered = MemmapEmbeddingStore(str(tmp_path))
+    recovered.put("b", vector(2))
+    assert (tmp_path / "keys.txt").read_bytes() == b"a\nb\n"
+    np.testing.assert_array_equal(MemmapEmbeddingStore(str(tmp_path)).get("b"), vector(2))
+
+
+def _write_keys(directory, prefix, count):
+    store = MemmapEmbeddingStore(directory, initial_capacity=4)
+    for i in range(count):
+        store.put(f"{prefix}{i}", vector(ord(prefix) * 1000 + i))
+
+
+def test_concurrent_writer_processes_never_share_a_row(tmp_path):
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=_write_keys, args=(str(tmp_path), prefix, 100)) for prefix in "xy"]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(60)
+        assert writer.exitcode == 0
+
+    store = MemmapEmbeddingStore(str(tmp_path))
+    assert len(store) == 200
+    for prefix in "xy":
+        for i in range(100):
+            np.testing.assert_array_equal(store.get(f"{prefix}{i}"), vector(ord(prefix) * 1000 + i))
+
+
+def test_embedding_cache_counts_hits_and_reads_through_to_disk(tmp_path):
+    cache = EmbeddingCache(max_entries=10, directory=str(tmp_path))
+    assert cache.get("k") is None
+    cache.put("k", [1.0, 2.0])
+    assert cache.get("k").dtype == np.float32
+
+    fresh = EmbeddingCache(max_entries=10, directory=str(tmp_path))
+    np.testing.assert_array_equal(fresh.get("k"), np.array([1.0, 2.0], dtype=np.float32))
+    assert fresh.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_async_reads_and_write_behind_use_the_disk_tier(tmp_path):
+    cache = EmbeddingCache(max_entries=10, directory=str(tmp_path))
+    cache.put_behind("k", [1.0, 2.0])
+    np.testing.assert_array_equal(cache.get("k"), np.array([1.0, 2.0], dtype=np.float32))
+    cache.close()
+
+    fresh = EmbeddingCache(max_entries=10, directory=str(tmp_path))
+    vectors = asyncio.run(fresh.aget_many(["k", "missing", "k"]))
+    np.testing.assert_array_equal(vectors[0], np.array([1.0, 2.0], dtype=np.float32))
+    assert vectors[1] is None
+    assert (fresh.stats()["hits"], fresh.stats()["misses"]) == (2, 1)
+    assert "k" in fresh.memory
+
+
+def test_disk_reads_do_not_run_on_the_event_loop(tmp_path, monkeypatch):
+    cache = EmbeddingCache(max_entries=10, directory=str(tmp_path))
+    loop_thread = threading.get_ident()
+    read_threads = []
+    real_get = cache.disk.get
+    monkeypatch.setattr(cache.disk, "get", lambda key: read_threads.append(threading.get_ident()) or real_get(key))
+    asyncio.run(cache.aget_many(["a", "b"]))
+    assert read_threads and loop_thread not in read_threads
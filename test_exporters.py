@@ -0,0 +1,70 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+
+import exporters
+import pdf_render
+from resume_parser import PERSONAL_HEADER, parse_document
+
+RESUME = """Personal Details
+Jane Doe
+jane@example.com
+EXPERIENCE
+• Built billing — 40% faster
+Python
+EXPERIENCE
+- Second role
+Education
+B.Tech, Example College"""
+
+
+def test_text_keeps_every_line_and_normalizes_typography():
+    text = exporters.render_text(parse_document(RESUME)).decode("utf-8")
+    assert text.splitlines() == [
+        "Jane Doe", "jane@example.com", "",
+        "EXPERIENCE", "- Built billing - 40% faster", "Python", "",
+        "EXPERIENCE", "- Second role", "",
+        "EDUCATION", "B.Tech, Example College",
+    ]
+
+
+def test_markdown_titles_the_name_not_the_personal_label():
+    markdown = exporters.render_markdown(parse_document(RESUME)).decode("utf-8")
+    assert markdown.startswith("# Jane Doe\n")
+    assert PERSONAL_HEADER not in markdown
+    assert markdown.count("## EXPERIENCE") == 2
+    assert "\nPython\n" in markdown
+
+
+def test_docx_title_is_the_name():
+    docx = pytest.importorskip("docx")
+    document = docx.Document(BytesIO(exporters.render_docx(parse_document(RESUME))))
+    paragraphs = [p.text for p in document.paragraphs]
+    assert paragraphs[0] == "Jane Doe"
+    assert PERSONAL_HEADER not in paragraphs
+    assert "B.Tech, Example College" in paragraphs
+
+
+def test_pdf_render_produces_a_pdf():
+    assert pdf_render.render(RESUME).startswith(b"%PDF")
+
+
+def test_export_caches_per_format(monkeypatch):
+    calls = []
+
+    def render(parsed):
+        calls.append(parsed)
+        return b"rendered"
+
+    monkeypatch.setitem(exporters.EXPORTERS, "txt", exporters.Exporter("text/plain", "txt", render))
+    exporters._exported.clear()
+    assert asyncio.run(exporters.export(RESUME, "txt")) == b"rendered"
+    assert asyncio.run(exporters.export(RESUME, "txt")) == b"rendered"
+    assert len(calls) == 1
+
+
+def test_etags_differ_by_format_and_content():
+    assert exporters.etag(RESUME, "md") != exporters.etag(RESUME, "txt")
+    assert exporters.etag(RESUME, "md") != exporters.etag(RESUME + "!", "md")
+    assert exporters.etag(RESUME, "pdf") == pdf_render.render_key(RESUME)
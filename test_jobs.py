@@ -0,0 +1,365 @@
+import asyncio
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import jobs
+from jobs import InMemoryJobStore, JobFailed, JobQueue, JobStore
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_POLL_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(jobs, "JOB_RETRY_BACKOFF_BASE", 0.05)
+
+
+async def wait_for_status(store, job_id, *statuses, timeout=2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await store.get(job_id)
+        if job["status"] in statuses or asyncio.get_running_loop().time() > deadline:
+            return job
+        await asyncio.sleep(0.01)
+
+
+def test_job_runs_and_records_progress_and_result():
+    async def handler(params, report):
+        await report(step="halfway")
+        return {"doubled": params["n"] * 2}
+
+    async def scenario():
+        queue = JobQueue(InMemoryJobStore(), workers=1)
+        queue.register("double", handler)
+        queue.start()
+        job_id = await queue.submit("double", {"n": 21})
+        job = await wait_for_status(queue.store, job_id, jobs.SUCCEEDED)
+        await queue.stop()
+        return job, queue.stats()
+
+    job, stats = run(scenario())
+    assert job["status"] == jobs.SUCCEEDED
+    assert job["result"] == {"doubled": 42}
+    assert job["progress"] == {"step": "halfway"}
+    assert stats["succeeded"] == 1
+
+
+def test_failed_attempts_are_retried_after_a_backoff():
+    started = []
+
+    async def flaky(params, report):
+        started.append(asyncio.get_running_loop().time())
+        if len(started) < 3:
+            raise RuntimeError("transient")
+        return "ok"
+
+    async def scenario():
+        queue = JobQueue(InMemoryJobStore(), workers=1, max_attempts=3)
+        queue.register("flaky", flaky)
+        queue.start()
+        job_id = await queue.submit("flaky", {})
+        job = await wait_for_status(queue.store, job_id, jobs.SUCCEEDED, jobs.FAILED)
+        await queue.stop()
+        return job
+
+    job = run(scenario())
+    assert job["status"] == jobs.SUCCEEDED
+    assert job["attempts"] == 3
+    # Jittered 0.05s then 0.1s base delays: each gap is at least half its base.
+    assert started[1] - started[0] >= 0.025
+    assert started[2] - started[1] >= 0.05
+
+
+def test_job_failed_is_not_retried():
+    async def broken(params, report):
+        raise JobFailed("bad input")
+
+    async def scenario():
+        queue = JobQueue(InMemoryJobStore(), workers=1)
+        queue.register("broken", broken)
+        queue.start()
+        job_id = await queue.submit("broken", {})
+        job = await wait_for_status(queue.store, job_id, jobs.FAILED)
+        await queue.stop()
+        return job
+
+    job = run(scenario())
+    assert (job["status"], job["attempts"], job["error"]) == (jobs.FAILED, 1, "bad input")
+
+
+def test_claim_skips_jobs_that_are_backing_off():
+    async def scenario():
+        store = InMemoryJobStore()
+        job_id = await store.create("kind", {})
+        await store.update(job_id, available_at=datetime.utcnow() + timedelta(hours=1))
+        early = await store.claim(lease_seconds=60, max_attempts=3)
+        await store.update(job_id, available_at=datetime.utcnow())
+        later = await store.claim(lease_seconds=60, max_attempts=3)
+        return early, later
+
+    early, later = run(scenario())
+    assert early is None
+    assert later["status"] == jobs.RUNNING
+
+
+def test_job_that_loses_its_lease_is_stopped():
+    async def scenario():
+        stopped = asyncio.Event()
+
+        async def slow(params, report):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+
+        store = InMemoryJobStore()
+        queue = JobQueue(store, workers=1, lease_seconds=0.15)
+        queue.register("slow", slow)
+        queue.start()
+        job_id = await queue.submit("slow", {})
+        await wait_for_status(store, job_id, jobs.RUNNING)
+        # Another worker re-claimed the job after our lease lapsed.
+        store._jobs.get(job_id)["attempts"] += 1
+        await asyncio.wait_for(stopped.wait(), 1)
+        await asyncio.sleep(0.05)
+        alive = all(not task.done() for task in queue._tasks)
+        await queue.stop()
+        return alive, await store.get(job_id)
+
+    alive, job = run(scenario())
+    assert alive
+    assert job["status"] == jobs.RUNNING
+
+
+def test_shutdown_hands_running_jobs_back():
+    async def slow(params, report):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        queue = JobQueue(InMemoryJobStore(), workers=1)
+        queue.register("slow", slow)
+        queue.start()
+        job_id = await queue.submit("slow", {})
+        await wait_for_status(queue.store, job_id, jobs.RUNNING)
+        await queue.stop()
+        return await queue.store.get(job_id)
+
+    assert run(scenario())["status"] == jobs.QUEUED
+
+
+def test_callback_receives_the_final_job_view(monkeypatch):
+    posted = []
+    monkeypatch.setattr(jobs, "_post_callback", lambda url, payload: posted.append((url, payload)))
+
+    async def handler(params, report):
+        return "done"
+
+    async def scenario():
+        queue = JobQueue(InMemoryJobStore(), workers=1)
+        queue.register("kind", handler)
+        queue.start()
+        job_id = await queue.submit("kind", {}, callback_url="https://hooks.example.com/done")
+        await wait_for_status(queue.store, job_id, jobs.SUCCEEDED)
+        for _ in range(100):
+            if posted:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return job_id
+
+    job_id = run(scenario())
+    assert posted[0][0] == "https://hooks.example.com/done"
+    assert posted[0][1]["job_id"] == job_id
+    assert posted[0][1]["result"] == "done"
+
+
+def test_submit_rejects_unknown_kinds():
+    with pytest.raises(ValueError):
+        run(JobQueue(InMemoryJobStore()).submit("nope", {}))
+
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook",
+    "http:///no-host",
+    "http://127.0.0.1/hook",
+    "http://10.1.2.3/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/hook",
+    "http://[::ffff:192.168.0.1]/hook",
+    "http://0.0.0.0/hook",
+    "http://224.0.0.1/hook",
+])
+def test_callback_urls_to_internal_addresses_are_rejected(url):
+    with pytest.raises(jobs.CallbackURLRejected):
+        jobs.validate_callback_url(url)
+
+
+def test_callback_url_to_a_public_address_is_accepted():
+    jobs.validate_callback_url("https://8.8.8.8/hook")
+
+
+def test_callback_allowlist(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_ALLOWED_HOSTS", {"8.8.8.8"})
+    jobs.validate_callback_url("https://8.8.8.8/hook")
+    with pytest.raises(jobs.CallbackURLRejected):
+        jobs.validate_callback_url("https://1.1.1.1/hook")
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        JobStore()
+
+
+class FlakyStore(InMemoryJobStore):
+    """Fails the first SUCCEEDED write, as a dropped Mongo connection would."""
+
+    def __init__(self):
+        super().__init__()
+        self.failures = 1
+
+    async def update(self, job_id, attempt=None, **fields):
+        if fields.get("status") == jobs.SUCCEEDED and self.failures:
+            self.failures -= 1
+            raise RuntimeError("connection reset")
+        return await super().update(job_id, attempt, **fields)
+
+
+def test_worker_survives_a_failing_store_write():
+    async def handler(params, report):
+        return params["n"]
+
+    async def scenario():
+        queue = JobQueue(FlakyStore(), workers=1)
+        queue.register("kind", handler)
+        queue.start()
+        first = await queue.submit("kind", {"n": 1})
+        second = await queue.submit("kind", {"n": 2})
+        job = await wait_for_status(queue.store, second, jobs.SUCCEEDED)
+        stats = queue.stats()
+        await queue.stop()
+        return await queue.store.get(first), job, stats
+
+    first, second, stats = run(scenario())
+    # The unrecorded job keeps its lease until it lapses and is claimed again.
+    assert first["status"] == jobs.RUNNING
+    assert second["result"] == 2
+    assert stats["workers"] == 1
+
+
+def test_stats_count_only_live_workers():
+    async def scenario():
+        queue = JobQueue(InMemoryJobStore(), workers=2)
+        queue.start()
+        queue._tasks[0].cancel()
+        await asyncio.sleep(0)
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    assert run(scenario())["workers"] == 1
+
+
+def test_writes_from_a_stale_claim_are_ignored():
+    async def scenario():
+        store = InMemoryJobStore()
+        job_id = await store.create("kind", {})
+        stale = await store.claim(lease_seconds=60, max_attempts=3)
+        # The lease lapsed and another worker re-claimed the job.
+        store._jobs.get(job_id)["attempts"] += 1
+        written = [
+            await store.update(job_id, attempt=stale["attempts"], status=jobs.SUCCEEDED),
+            await store.update(job_id, attempt=stale["attempts"], status=jobs.QUEUED),
+        ]
+        return written, await store.get(job_id), list(store._queued)
+
+    written, job, queued = run(scenario())
+    assert written == [False, False]
+    assert job["status"] == jobs.RUNNING
+    assert queued == []
+
+
+def test_slow_callbacks_do_not_hold_a_worker(monkeypatch):
+    monkeypatch.setattr(jobs, "_post_callback", lambda url, payload: time.sleep(0.5))
+
+    async def handler(params, report):
+        return "done"
+
+    async def scenario():
+        queue = JobQueue(InMemoryJobStore(), workers=1)
+        queue.register("kind", handler)
+        queue.start()
+        await queue.submit("kind", {}, callback_url="https://hooks.example.com/slow")
+        second = await queue.submit("kind", {})
+        job = await wait_for_status(queue.store, second, jobs.SUCCEEDED, timeout=0.3)
+        pending = queue.stats()["callbacks_pending"]
+        await queue.stop()
+        return job, pending
+
+    job, pending = run(scenario())
+    assert job["status"] == jobs.SUCCEEDED
+    assert pending == 1
+
+
+def test_no_sleep_after_the_last_callback_attempt(monkeypatch):
+    attempts = []
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_RETRIES", 1)
+
+    def fail(url, payload):
+        attempts.append(url)
+        raise ConnectionError("down")
+
+    monkeypatch.setattr(jobs, "_post_callback", fail)
+
+    async def scenario():
+        store = InMemoryJobStore()
+        job_id = await store.create("kind", {}, "https://hooks.example.com/done")
+        started = asyncio.get_running_loop().time()
+        await JobQueue(store)._notify(job_id)
+        return asyncio.get_running_loop().time() - started
+
+    assert run(scenario()) < 0.5
+    assert len(attempts) == 1
+
+
+def test_callback_connects_to_the_validated_address(monkeypatch):
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append((self.headers["Host"], self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    real_getaddrinfo = jobs.socket.getaddrinfo
+    answers = iter(["127.0.0.1"])
+
+    def rebinding_getaddrinfo(host, *args, **kwargs):
+        if host != "hooks.example.com":
+            return real_getaddrinfo(host, *args, **kwargs)
+        # First answer passes validation; any later lookup would hit metadata.
+        address = next(answers, "169.254.169.254")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+    monkeypatch.setattr(jobs.socket, "getaddrinfo", rebinding_getaddrinfo)
+    # Let the loopback test server stand in for a public host.
+    monkeypatch.setattr(jobs, "_is_public_address", lambda address: True)
+    try:
+        jobs._post_callback(f"http://hooks.example.com:{port}/done", {"ok": True})
+    finally:
+        server.shutdown()
+    assert received == [(f"hooks.example.com:{port}", b'{"ok": true}')]
@@ -0,0 +1,40 @@
+from keyword_engine import KeywordMatcher, compile_keywords, extract_keywords, tokenize
+
+
+def test_tokenize_keeps_technology_tokens_intact():
+    assert tokenize("Node.js, C++ and C# on CI/CD.") == ["node.js", "c++", "and", "c#", "on", "ci/cd"]
+
+
+def test_extract_keywords_ranks_by_frequency_and_skips_stopwords():
+    text = "Python developer. Python, Docker and Kubernetes. Docker experience with Python required."
+    keywords = extract_keywords(text, top_n=3)
+    assert keywords == ["python", "docker", "developer"]
+
+
+def test_extract_keywords_adds_repeated_phrases():
+    text = "machine learning models; machine learning pipelines; data pipelines"
+    keywords = extract_keywords(text)
+    assert "machine learning" in keywords
+    assert "data pipelines" not in keywords
+    assert "learning models" not in keywords
+
+
+def test_extract_keywords_drops_short_and_numeric_tokens():
+    assert extract_keywords("go is ok 2024 2024 rust") == ["rust"]
+
+
+def test_matcher_matches_whole_tokens_and_phrases():
+    matcher = KeywordMatcher(["python", "machine learning", "java", "Node.js"])
+    found = matcher.match("Built machine learning services in Python and node.js; no javascript.")
+    assert found == {"python", "machine learning", "Node.js"}
+
+
+def test_matcher_coverage():
+    matcher = KeywordMatcher(["python", "aws", "docker", "sql"])
+    assert matcher.coverage("Python on AWS") == 0.5
+    assert KeywordMatcher([]).coverage("anything") == 0.0
+
+
+def test_compile_keywords_is_cached_per_keyword_tuple():
+    keywords = ("python", "aws")
+    assert compile_keywords(keywords) is compile_keywords(keywords)
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+import llm_scheduler
+from llm_scheduler import LLMScheduler, LLMUnavailableError
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_BACKOFF_BASE", 0.001)
+
+
+class FlakyChain:
+    """Raises the client's own ``TimeoutError`` for the first ``failures`` calls."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise TimeoutError("read timed out")
+        return "ok"
+
+    async def astream(self, inputs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise TimeoutError("read timed out")
+        for chunk in ("a", "b"):
+            yield chunk
+
+
+class SlowChain:
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(5)
+
+    async def astream(self, inputs):
+        await asyncio.sleep(5)
+        yield "late"
+
+
+def scheduler():
+    return LLMScheduler(requests_per_minute=6000)
+
+
+def test_client_timeouts_are_retried():
+    async def scenario():
+        llm = scheduler()
+        chain = FlakyChain(failures=2)
+        return await llm.invoke(chain, {}, "model"), chain.calls, llm.stats()
+
+    result, calls, stats = asyncio.run(scenario())
+    assert (result, calls) == ("ok", 3)
+    assert stats["retries"] == 2 and stats["failures"] == 0
+
+
+def test_stream_retries_client_timeouts_before_the_first_chunk():
+    async def scenario():
+        chain = FlakyChain(failures=1)
+        return [chunk async for chunk in scheduler().stream(chain, {}, "model")], chain.calls
+
+    assert asyncio.run(scenario()) == (["a", "b"], 2)
+
+
+def test_deadline_is_enforced_for_invoke_and_stream():
+    async def scenario():
+        llm = scheduler()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(LLMUnavailableError, match="deadline"):
+            await llm.invoke(SlowChain(), {}, "model", deadline=0.1)
+        with pytest.raises(LLMUnavailableError, match="deadline"):
+            async for _ in llm.stream(SlowChain(), {}, "model", deadline=0.1):
+                pass
+        return loop.time() - started, llm.stats()
+
+    elapsed, stats = asyncio.run(scenario())
+    assert elapsed < 1
+    assert stats["failures"] == 2 and stats["retries"] == 0
+
+
+def test_retries_give_up_after_max_retries():
+    async def scenario():
+        llm = LLMScheduler(requests_per_minute=6000, max_retries=1)
+        await llm.invoke(FlakyChain(failures=5), {}, "model")
+
+    with pytest.raises(LLMUnavailableError, match="call failed"):
+        asyncio.run(scenario())
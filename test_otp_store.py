@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+import cache
+from otp_store import InMemoryOTPStore, OTPStore, create_otp_store
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_code_is_consumed_by_the_first_successful_verify():
+    async def scenario():
+        store = InMemoryOTPStore()
+        await store.put("a@example.com", "123456")
+        return [await store.verify("a@example.com", "123456"), await store.verify("a@example.com", "123456")]
+
+    assert run(scenario()) == [True, False]
+
+
+def test_code_is_invalidated_after_max_attempts():
+    async def scenario():
+        store = InMemoryOTPStore(max_attempts=2)
+        await store.put("a@example.com", "123456")
+        wrong = [await store.verify("a@example.com", "000000") for _ in range(2)]
+        return wrong, await store.verify("a@example.com", "123456")
+
+    assert run(scenario()) == ([False, False], False)
+
+
+def test_non_ascii_or_non_digit_guesses_fail_without_raising():
+    async def scenario():
+        store = InMemoryOTPStore()
+        await store.put("a@example.com", "123456")
+        guesses = ["١٢٣٤٥٦", "12345é", "", "12345 "]
+        return [await store.verify("a@example.com", guess) for guess in guesses]
+
+    assert run(scenario()) == [False] * 4
+
+
+def test_put_replaces_the_previous_code():
+    async def scenario():
+        store = InMemoryOTPStore()
+        await store.put("a@example.com", "111111")
+        await store.put("a@example.com", "222222")
+        return await store.verify("a@example.com", "111111"), await store.verify("a@example.com", "222222")
+
+    assert run(scenario()) == (False, True)
+
+
+def test_codes_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+
+    async def scenario():
+        store = InMemoryOTPStore(ttl=60)
+        await store.put("a@example.com", "123456")
+        now[0] += 61
+        return await store.verify("a@example.com", "123456")
+
+    assert run(scenario()) is False
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        OTPStore()
+    with pytest.raises(ValueError):
+        create_otp_store("redis")
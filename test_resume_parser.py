@@ -0,0 +1,85 @@
+from resume_parser import (
+    EDUCATION_HEADER, KIND_EDUCATION, KIND_PERSONAL, PERSONAL_HEADER, ParsedResume, header_kind,
+    parse_document, parse_resume, split_bullet,
+)
+
+RESUME = """Jane Doe
+jane@example.com | +1 555 010 0000
+linkedin.com/in/janedoe
+Backend engineer, focused on APIs.
+WORK EXPERIENCE
+- Built billing at Example Corp
+- Cut latency 40%
+Skills
+Python, FastAPI, Docker
+EDUCATION
+B.Tech, Example University, 2018"""
+
+
+def test_parse_resume_splits_personal_block_and_sections():
+    parsed = parse_resume(RESUME)
+    assert parsed.headers == [PERSONAL_HEADER, "WORK EXPERIENCE", "Skills", "EDUCATION"]
+    assert parsed.get(PERSONAL_HEADER).kind == KIND_PERSONAL
+    assert parsed.get("EDUCATION").kind == KIND_EDUCATION
+    assert parsed.get("WORK EXPERIENCE").lines() == ["- Built billing at Example Corp", "- Cut latency 40%"]
+
+
+def test_parse_resume_offsets_point_into_the_source():
+    parsed = parse_resume(RESUME)
+    section = parsed.get("Skills")
+    assert RESUME[section.start:section.end] == "Skills\nPython, FastAPI, Docker"
+
+
+def test_only_content_sections_are_rewritable():
+    parsed = parse_resume(RESUME)
+    assert list(parsed.rewritable()) == ["WORK EXPERIENCE", "Skills"]
+    assert list(parsed.excluded()) == [PERSONAL_HEADER, "EDUCATION"]
+
+
+def test_education_is_synthesized_from_college_lines_without_a_header():
+    parsed = parse_resume("Jane Doe\nEXPERIENCE\nIntern at Example Institute of Technology")
+    assert parsed.get(EDUCATION_HEADER).body == "Intern at Example Institute of Technology"
+    assert parsed.get(EDUCATION_HEADER).start is None
+
+
+def test_header_kind_matches_aliases_case_insensitively():
+    assert header_kind("Academic Background") == KIND_EDUCATION
+    assert header_kind("CONTACT INFORMATION") == KIND_PERSONAL
+    assert header_kind("Projects") == "content"
+
+
+def test_split_bullet():
+    assert split_bullet("• Shipped it") == (True, "Shipped it")
+    assert split_bullet("-5% churn") == (False, "-5% churn")
+
+
+def test_round_trips_through_dict():
+    parsed = parse_resume(RESUME)
+    assert ParsedResume.from_dict(parsed.to_dict()) == parsed
+
+
+def test_parse_resume_drops_unheaded_lines_that_parse_document_keeps():
+    unheaded = "Backend engineer, focused on APIs."
+    assert unheaded not in parse_resume(RESUME).text()
+    assert parse_document(RESUME).sections[0].lines()[-1] == unheaded
+
+
+def test_parse_document_keeps_every_line_in_order():
+    text = "Jane Doe\nEXPERIENCE\n- First\nPython\nEXPERIENCE\n- Second\nEducation\nExample College"
+    parsed = parse_document(text)
+    kept = [line for section in parsed.sections for line in
+            ([section.header] if section.titled else []) + section.lines()]
+    assert kept == text.splitlines()
+    assert [s.header for s in parsed.sections] == [PERSONAL_HEADER, "EXPERIENCE", "EXPERIENCE", "Education"]
+    assert not parsed.sections[0].titled
+
+
+def test_parse_document_drops_the_synthesized_personal_label():
+    parsed = parse_document("Personal Details\nJane Doe\nSKILLS\nPython")
+    assert parsed.sections[0].lines() == ["Jane Doe"]
+    assert all(PERSONAL_HEADER not in section.lines() for section in parsed.sections)
+
+
+def test_parse_document_without_a_leading_block():
+    parsed = parse_document("Summary:\nEngineer")
+    assert [(s.header, s.lines()) for s in parsed.sections] == [("Summary", ["Engineer"])]
@@ -1,9 +1,11 @@
 import random
-import smtplib
 from email.message import EmailMessage
 from dotenv import load_dotenv
 import os
 
+from email_dispatcher import EmailDispatcher
+from otp_store import create_otp_store
+
 load_dotenv()
 
 EMAIL_HOST = os.getenv("EMAIL_HOST")
@@ -11,25 +13,25 @@ EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 
-otp_store = {}
+otp_store = create_otp_store()
+email_dispatcher = EmailDispatcher(EMAIL_HOST, EMAIL_PORT, EMAIL_ADDRESS, EMAIL_PASSWORD)
 
 def generate_otp():
     return str(random.randint(100000, 999999))
 
 def send_otp_email(recipient_email: str, otp: str):
+    """Queue the OTP email; delivery and retries happen on the dispatcher's workers."""
     msg = EmailMessage()
     msg.set_content(f"Your OTP code for signup is: {otp}")
     msg["Subject"] = "Your OTP for OptiCV"
     msg["From"] = EMAIL_ADDRESS
     msg["To"] = recipient_email
 
-    with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-        server.starttls()
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-        server.send_message(msg)
+    email_dispatcher.enqueue(msg)
 
-def store_otp(email: str, otp: str):
-    otp_store[email] = otp
+async def store_otp(email: str, otp: str):
+    await otp_store.put(email, otp)
 
-def verify_otp(email: str, otp: str) -> bool:
-    return otp_store.get(email) == otp
+async def verify_otp(email: str, otp: str) -> bool:
+    """Check and consume the code; a code only verifies once."""
+    return await otp_store.verify(email, otp)